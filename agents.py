@@ -1,57 +1,34 @@
 from crewai import Agent
-from model_config import language_model
+from model_config import role_models
+from prompt_templates import agent_definitions
 
 
 class ContentCalendarAgents:
-    def __init__(self):
-        self.model = language_model
-    
-    def brand_analyzer(self):
+    def __init__(self, models=None, definitions=None):
+        # llm per role, see model_config.role_settings
+        self.models = dict(models or role_models)
+        # role, goal and backstory per role, see prompt_templates
+        self.definitions = definitions or agent_definitions
+
+    def agent(self, name):
         return Agent(
-            role='brand strategy analyst',
-            goal='analyze brand voice, target audience, and content goals',
-            backstory='expert in brand positioning and audience research with deep understanding of social media dynamics',
+            **self.definitions[name],
             verbose=False,
             allow_delegation=False,
-            llm=self.model
+            llm=self.models[name]
         )
     
+    def brand_analyzer(self):
+        return self.agent('brand_analyzer')
+    
     def trend_researcher(self):
-        return Agent(
-            role='social media trend researcher',
-            goal='identify trending topics, hashtags, and content opportunities',
-            backstory='social media analyst specializing in viral content patterns and platform algorithms',
-            verbose=False,
-            allow_delegation=False,
-            llm=self.model
-        )
+        return self.agent('trend_researcher')
     
     def content_strategist(self):
-        return Agent(
-            role='content calendar strategist',
-            goal='create strategic content calendar with posting schedule and themes',
-            backstory='content strategy expert with experience planning social media campaigns for brands',
-            verbose=False,
-            allow_delegation=False,
-            llm=self.model
-        )
+        return self.agent('content_strategist')
     
     def copywriter(self):
-        return Agent(
-            role='social media copywriter',
-            goal='write engaging posts optimized for each platform',
-            backstory='creative copywriter specialized in viral social media content and platform-specific formats',
-            verbose=False,
-            allow_delegation=False,
-            llm=self.model
-        )
+        return self.agent('copywriter')
     
     def calendar_packager(self):
-        return Agent(
-            role='content calendar compiler',
-            goal='compile content calendar into professional html format with all posts and scheduling details',
-            backstory='content operations specialist expert in organizing and presenting content calendars',
-            verbose=False,
-            allow_delegation=False,
-            llm=self.model
-        )
+        return self.agent('calendar_packager')
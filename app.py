@@ -1,7 +1,10 @@
+import json
+import os
 import sys
+import time
 import streamlit as st
-from crew import ContentCalendarCrew
-from file_generator import generate_pdf
+from horizon import horizon_label, horizon_months
+from jobs import JobQueue, start_workers, QUEUED, RUNNING, DONE, FAILED
 
 
 if hasattr(sys.stdout, 'reconfigure'):
@@ -54,8 +57,27 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-if 'processing' not in st.session_state:
-    st.session_state.processing = False
+JOBS_PATH = os.getenv("JOBS_PATH", ".jobs.sqlite")
+
+
+@st.cache_resource
+def job_queue():
+    # one set of worker processes per server, shared by every session
+    start_workers(JOBS_PATH, count=int(os.getenv("JOB_WORKERS", "2")))
+    jobs = JobQueue(JOBS_PATH)
+    if os.getenv("METRICS_PORT"):
+        from instrumentation import start_metrics_server
+        # prometheus text of the last finished run at METRICS_HOST:METRICS_PORT/metrics
+        start_metrics_server(int(os.getenv("METRICS_PORT")), jobs.latest_report,
+                             os.getenv("METRICS_HOST", "127.0.0.1"))
+    return jobs
+
+
+queue = job_queue()
+
+if 'job_id' not in st.session_state:
+    # the job id lives in the url too, so a browser refresh picks the job back up
+    st.session_state.job_id = st.query_params.get("job")
 if 'result' not in st.session_state:
     st.session_state.result = None
 
@@ -120,51 +142,72 @@ with st.form("content_form"):
             height=80
         )
         avoid_topics = st.text_input("topics to avoid", placeholder="politics, religion")
+        months = st.select_slider(
+            "months to plan",
+            options=[1, 2, 3, 6, 12],
+            value=1
+        )
+        assemble = st.checkbox("fast packaging (build the calendar from the copy without the packager agent)")
     
     st.markdown('<div class="tip-box">💡 tip: the more details you provide, the better your content calendar will be</div>', unsafe_allow_html=True)
     
     submit = st.form_submit_button("Generate content calendar", use_container_width=True)
 
-if submit and not st.session_state.processing:
-    if brand_name and industry and target_audience and content_goals:
-        st.session_state.processing = True
-        
-        brand_input = f"""
-        brand name: {brand_name}
-        industry: {industry}
-        brand voice: {brand_voice}
-        
-        target audience: {target_audience}
-        
-        content goals: {content_goals}
-        
-        platforms: {', '.join(platforms)}
-        posting frequency: {posting_frequency} posts per week
-        
-        content themes:
-        {content_themes}
-        
-        brand values: {brand_values or 'not specified'}
-        competitors: {competitors or 'not specified'}
-        upcoming events: {special_events or 'none'}
-        avoid topics: {avoid_topics or 'none'}
-        """
+job = queue.get(st.session_state.job_id) if st.session_state.job_id else None
+
+if submit:
+    if job and job['status'] in (QUEUED, RUNNING):
+        st.info("a calendar is already being generated, please wait for it to finish")
+    elif brand_name and industry and target_audience and content_goals:
+        brand_input = {
+            "brand_name": brand_name,
+            "industry": industry,
+            "brand_voice": brand_voice,
+            "target_audience": target_audience,
+            "content_goals": content_goals,
+            "platforms": platforms,
+            "posting_frequency": posting_frequency,
+            "content_themes": content_themes,
+            "brand_values": brand_values,
+            "competitors": competitors,
+            "special_events": special_events,
+            "avoid_topics": avoid_topics,
+        }
         
-        with st.spinner("🎨 working on it... this may take a minute"):
-            try:
-                crew = ContentCalendarCrew()
-                result = crew.execute(brand_input)
-                st.session_state.result = result
-                st.success("Calender is ready")
-                
-            except Exception as e:
-                st.error(f"❌ error: {str(e)}")
-            
-        st.session_state.processing = False
+        st.session_state.job_id = queue.submit(brand_input, {"months": months, "assemble": assemble})
+        st.query_params["job"] = st.session_state.job_id
+        st.session_state.result = None
+        st.session_state.pop('pdf_content', None)
         st.rerun()
     else:
         st.error("please fill required fields: brand name, industry, target audience, content goals")
 
+if job and job['status'] in (QUEUED, RUNNING):
+    with st.status("🎨 working on it... this may take a minute", expanded=True):
+        st.markdown(f"🗓️ planning {horizon_label(horizon_months(job['options'].get('months', 1)))}")
+        if job['status'] == QUEUED:
+            st.markdown(f"⏳ waiting in queue (position {job['position']})")
+        for stage, progress in job['progress'].get('stages', {}).items():
+            if progress['state'] == DONE:
+                note = "reused" if progress['reused'] else f"{progress['seconds']:.1f}s"
+                if progress.get('context'):
+                    note += f", context {progress['context']['before']} → {progress['context']['after']} tokens"
+                st.markdown(f"✅ **{stage}** finished ({note})")
+            else:
+                st.markdown(f"✍️ **{stage}**\n\n{progress['tail']}")
+    time.sleep(1.5)
+    st.rerun()
+elif job and job['status'] == FAILED:
+    st.error(f"❌ error: {job['error']}")
+elif job and job['status'] == DONE and st.session_state.result is None:
+    st.session_state.result = job['result']
+    st.session_state.brand_name = job['brand_input']['brand_name']
+    st.session_state.reused = job['progress'].get('reused', [])
+    st.session_state.recalled = job['progress'].get('recalled', {})
+    st.session_state.cache_stats = job['progress'].get('cache')
+    st.session_state.context_tokens = job['progress'].get('context_tokens', {})
+    st.session_state.report = job['progress'].get('report')
+
 if st.session_state.result:
     st.markdown('<h2 class="section-header"> your content calendar</h2>', unsafe_allow_html=True)
     
@@ -178,12 +221,9 @@ if st.session_state.result:
             if st.button(" generate pdf", use_container_width=True):
                 try:
                     with st.spinner("generating pdf..."):
-                        pdf_path = generate_pdf(st.session_state.result)
-                        
-                        with open(pdf_path, 'rb') as f:
-                            pdf_content = f.read()
-                        
-                        st.session_state.pdf_content = pdf_content
+                        # reportlab is only loaded once someone asks for a pdf
+                        from file_generator import generate_pdf
+                        st.session_state.pdf_content = generate_pdf(st.session_state.result)
                         st.success("✅ pdf generated")
                         
                 except Exception as e:
@@ -196,12 +236,39 @@ if st.session_state.result:
                 st.download_button(
                     label="⬇️ download",
                     data=st.session_state.pdf_content,
-                    file_name=f"{brand_name.replace(' ', '_')}_content_calendar.pdf",
+                    file_name=f"{st.session_state.get('brand_name', brand_name).replace(' ', '_')}_content_calendar.pdf",
                     mime="application/pdf",
                     use_container_width=True
                 )
     
     with col2:
+        if st.session_state.get('cache_stats'):
+            stats = st.session_state.cache_stats
+            st.caption(f"llm cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate, {stats['entries']} entries)")
+        recalled = st.session_state.get('recalled') or {}
+        unchanged = [stage for stage in st.session_state.get('reused', []) if stage not in recalled]
+        if unchanged:
+            st.caption(f"reused unchanged stages: {', '.join(unchanged)}")
+        if recalled:
+            st.caption(f"reused from a similar brand: {', '.join(f'{stage} ({score:.0%} similar)' for stage, score in recalled.items())}")
+        if st.session_state.get('context_tokens'):
+            tokens = st.session_state.context_tokens.values()
+            before, after = sum(t['before'] for t in tokens), sum(t['after'] for t in tokens)
+            st.caption(f"stage context: {before} → {after} estimated prompt tokens")
+        if st.session_state.get('report'):
+            report = st.session_state.report
+            totals = report['totals']
+            with st.expander(f"run breakdown: {report['wall_seconds']:.1f}s, {totals['prompt_tokens']} prompt + {totals['completion_tokens']} completion tokens"):
+                st.dataframe(
+                    [{"stage": stage, **stats} for stage, stats in report['stages'].items()],
+                    use_container_width=True
+                )
+                st.download_button(
+                    label="run report (json)",
+                    data=json.dumps(report, indent=2),
+                    file_name="run_report.json",
+                    mime="application/json"
+                )
         st.markdown("### 📋 next steps")
         st.markdown("""
         1.  review generated content
@@ -0,0 +1,107 @@
+import re
+from collections import Counter
+
+from calendar_schema import CalendarData
+from context_compaction import sections
+from file_generator import DAYS, HASHTAG, PILLAR, build_post
+from shards import split_posts
+
+FIELD_LABELS = {
+    'platform': 'platform',
+    'posting day': 'posting_day',
+    'day': 'posting_day',
+    'best posting time': 'posting_time',
+    'posting time': 'posting_time',
+    'time': 'posting_time',
+    'content type': 'content_type',
+    'type': 'content_type',
+}
+
+# a label needs its colon, so copy like "Time-saving hacks" is not read as one
+LABELED_FIELD = re.compile(
+    r'^[\s>*_-]*(' + '|'.join(sorted(map(re.escape, FIELD_LABELS), key=len, reverse=True)) + r')\s*:\s*(.+)',
+    re.IGNORECASE
+)
+PILLAR_DESCRIPTION = re.compile(r'(.+?)(?:\s*[:–]\s*|\s+-\s+)(.+)')
+BULLET = re.compile(r'^[\s>*•-]*(?:\d+[.)]\s*)?')
+
+
+def assemble_post(index, block):
+    """Calendar post from one 'post N' block of copywriter output, keeping its
+    full copy; the first line labelled with a field sets it"""
+    lines = block.splitlines()
+    post = build_post(index, index + 1, lines, limit=None)
+    labelled = set()
+    for line in lines[1:]:
+        field = LABELED_FIELD.match(line.replace('**', ''))
+        if field and FIELD_LABELS[field.group(1).lower()] not in labelled:
+            value = field.group(2).strip().strip('*_')
+            name = FIELD_LABELS[field.group(1).lower()]
+            labelled.add(name)
+            post[name] = value.lower() if name == 'platform' else value
+    day = post['posting_day'].split()[0].capitalize() if post['posting_day'] else ''
+    post['posting_day'] = day if day in DAYS else DAYS[index % 7]
+    return post
+
+
+def pillars_from(text):
+    """Content pillars named in a strategy or brand profile, at most six"""
+    pillars = []
+    for line in text.splitlines():
+        match = PILLAR.match(line.replace('**', ''))
+        if match:
+            pillars.append(match.group(1))
+    if not pillars:
+        for heading, items in sections(text):
+            if heading and re.search(r'pillar|theme', heading, re.IGNORECASE):
+                pillars.extend(BULLET.sub('', item) for item in items)
+                break
+
+    result = []
+    for pillar in pillars[:6]:
+        match = PILLAR_DESCRIPTION.match(pillar)
+        title, description = match.groups() if match else (pillar, '')
+        result.append({"title": title.strip()[:60], "description": description.strip()})
+    return result
+
+
+def posting_schedule(posts, weeks):
+    """One schedule row per platform, derived from the posts themselves"""
+    schedule = []
+    for platform in dict.fromkeys(post['platform'] for post in posts):
+        platform_posts = [post for post in posts if post['platform'] == platform]
+        per_week = len(platform_posts) / weeks
+        times = Counter(post['posting_time'] for post in platform_posts if post['posting_time'])
+        types = Counter(post['content_type'] for post in platform_posts if post['content_type'])
+        schedule.append({
+            "platform": platform.title(),
+            "frequency": "Daily" if per_week >= 7 else f"{max(1, round(per_week))}x/week",
+            "best_times": ', '.join(time for time, _ in times.most_common(2)),
+            "content_type": types.most_common(1)[0][0] if types else "",
+        })
+    return schedule
+
+
+def brand_name_from(brand_input):
+    if isinstance(brand_input, dict):
+        return brand_input.get('brand_name') or "Content Calendar"
+    match = re.search(r'^\s*brand name:\s*(.+)$', str(brand_input), re.IGNORECASE | re.MULTILINE)
+    return match.group(1).strip() if match else "Content Calendar"
+
+
+def assemble_calendar(brand_input, month, brand, trends, strategy, content):
+    """Build the calendar from the brand, trend, strategy and copy outputs
+    without an llm call; returns CalendarData JSON like the packager's"""
+    posts = [assemble_post(i, block) for i, block in enumerate(split_posts(content))]
+    hashtags = Counter(tag for post in posts for tag in post['hashtags'])
+    hashtags.update(HASHTAG.findall(trends))
+
+    calendar = CalendarData.model_validate({
+        "brand_name": brand_name_from(brand_input),
+        "month": month,
+        "content_pillars": pillars_from(strategy) or pillars_from(brand),
+        "posts": posts,
+        "hashtag_bank": [tag for tag, _ in hashtags.most_common(30)],
+        "posting_schedule": posting_schedule(posts, weeks=52 / 12),
+    })
+    return calendar.model_dump_json()
@@ -0,0 +1,194 @@
+import threading
+import time
+import urllib.request
+from typing import Any, List
+
+import openai
+from crewai import LLM
+from crewai.llms.base_llm import call_stop_override, call_stream_override
+from pydantic import PrivateAttr
+
+from llm_wrapper import LLMWrapper
+
+# errors that mean the endpoint, not the request, is at fault; the call is
+# retried on another backend and the failing one is taken out of rotation
+FAILOVER_ERRORS = (
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class Backend:
+    """One inference endpoint of a BackendPool"""
+
+    def __init__(self, llm, max_concurrency=2, model=None):
+        self.llm = llm
+        # provider-qualified name, e.g. ollama/llama3.2:3b; llm.model drops the provider
+        self.model = model or llm.model
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0
+        self.healthy = True
+        self.down_until = 0.0
+
+    @property
+    def url(self):
+        url = (self.llm.base_url or '').rstrip('/')
+        return url[:-len('/v1')] if url.endswith('/v1') else url
+
+    def is_up(self, now):
+        return self.healthy or now >= self.down_until
+
+    def probe(self, timeout=2.0):
+        """True if the server answers its model list (ollama or openai-compatible)"""
+        for path in ('/api/tags', '/v1/models'):
+            try:
+                with urllib.request.urlopen(self.url + path, timeout=timeout) as response:
+                    if response.status == 200:
+                        return True
+            except (OSError, ValueError):
+                continue
+        return False
+
+
+class BackendPool(LLMWrapper):
+    """Spreads calls over several endpoints.
+
+    Each call goes to the healthy backend with the fewest outstanding
+    requests that is below its concurrency limit, waiting for a free slot
+    when all are busy. A backend that fails with a connection or server
+    error is marked down for `cooldown` seconds and the call fails over to
+    the next one; health checks bring it back as soon as it answers again.
+
+    clients holds the llm used for each backend; variants of a pool share
+    its backends, so limits and health hold across every variant.
+    """
+
+    backends: List[Any] = []
+    clients: List[Any] = []
+    cooldown: float = 30.0
+    wait_timeout: float = 600.0
+
+    _condition: Any = PrivateAttr(default_factory=threading.Condition)
+
+    def __init__(self, backends, clients=None, cooldown=30.0, wait_timeout=600.0):
+        if not backends:
+            raise ValueError("a backend pool needs at least one backend")
+        clients = clients or [backend.llm for backend in backends]
+        super().__init__(clients[0], backends=backends, clients=clients, cooldown=cooldown,
+                         wait_timeout=wait_timeout)
+
+    @classmethod
+    def from_urls(cls, entries, model, temperature=None, max_concurrency=2, **kwargs):
+        """Pool from 'base_url' or 'model@base_url' entries"""
+        backends = []
+        for entry in entries:
+            entry_model, _, url = entry.strip().rpartition('@')
+            # the pool does the retrying, on a different backend
+            llm = LLM(model=entry_model or model, base_url=url, temperature=temperature, max_retries=0)
+            backends.append(Backend(llm, max_concurrency, entry_model or model))
+        return cls(backends, **kwargs)
+
+    def variant(self, model=None, temperature=None, max_tokens=None):
+        """Pool over the same backends whose calls use other model settings"""
+        clients = [
+            LLM(model=model or backend.model, base_url=backend.llm.base_url, temperature=temperature,
+                max_tokens=max_tokens, max_retries=0)
+            for backend in self.backends
+        ]
+        pool = BackendPool(self.backends, clients, self.cooldown, self.wait_timeout)
+        pool._condition = self._condition
+        return pool
+
+    def client(self, backend):
+        return self.clients[self.backends.index(backend)]
+
+    def acquire(self, tried):
+        deadline = time.monotonic() + self.wait_timeout
+        with self._condition:
+            while True:
+                now = time.time()
+                untried = [backend for backend in self.backends if backend not in tried]
+                # backends marked down are only used once every live one has failed
+                candidates = [backend for backend in untried if backend.is_up(now)] or untried
+                if not candidates:
+                    return None
+
+                free = [backend for backend in candidates if backend.outstanding < backend.max_concurrency]
+                if free:
+                    backend = min(free, key=lambda backend: (backend.outstanding, backend.served))
+                    backend.outstanding += 1
+                    return backend
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("no llm backend became free in time")
+                self._condition.wait(remaining)
+
+    def release(self, backend, failed=False):
+        with self._condition:
+            backend.outstanding -= 1
+            if failed:
+                backend.failures += 1
+                backend.healthy = False
+                backend.down_until = time.time() + self.cooldown
+            else:
+                backend.served += 1
+                backend.healthy = True
+            self._condition.notify_all()
+
+    def call(self, messages, *args, **kwargs):
+        tried, error = [], None
+        while True:
+            backend = self.acquire(tried)
+            if backend is None:
+                raise error
+            tried.append(backend)
+
+            client = self.client(backend)
+            try:
+                with call_stop_override(client, self.stop_sequences), \
+                        call_stream_override(client, bool(self._effective_stream())):
+                    result = client.call(messages, *args, **kwargs)
+            except FAILOVER_ERRORS as e:
+                self.release(backend, failed=True)
+                error = e
+                continue
+            except BaseException:
+                # including a StopGeneration that ends a streamed answer early
+                self.release(backend)
+                raise
+
+            self.release(backend)
+            return result
+
+    def check_health(self):
+        for backend in self.backends:
+            up = backend.probe()
+            with self._condition:
+                backend.healthy = up
+                if not up:
+                    backend.down_until = time.time() + self.cooldown
+                self._condition.notify_all()
+
+    def start_health_checks(self, interval=15.0):
+        def loop():
+            while True:
+                self.check_health()
+                time.sleep(interval)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def stats(self):
+        with self._condition:
+            return [{
+                "url": backend.url,
+                "model": backend.llm.model,
+                "healthy": backend.healthy,
+                "outstanding": backend.outstanding,
+                "served": backend.served,
+                "failures": backend.failures,
+            } for backend in self.backends]
@@ -0,0 +1,163 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+
+from content_tasks import BRAND_FIELDS
+from crew import ContentCalendarCrew
+from file_generator import generate_pdf, result_text
+from model_config import semantic_index
+
+
+def load_brands(path):
+    """Read brand inputs from a CSV (one column per brand field) or JSONL file"""
+    if path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            brands = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            brands = list(csv.DictReader(f))
+
+    for brand in brands:
+        unknown = set(brand) - set(BRAND_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown brand fields in {path}: {', '.join(sorted(unknown))}")
+        if not brand.get('brand_name'):
+            raise ValueError(f"every brand in {path} needs a brand_name")
+    return brands
+
+
+def brand_slug(brand, taken):
+    slug = re.sub(r'[^a-z0-9]+', '_', brand['brand_name'].lower()).strip('_') or 'brand'
+    candidate, n = slug, 2
+    while candidate in taken:
+        candidate, n = f"{slug}_{n}", n + 1
+    taken.add(candidate)
+    return candidate
+
+
+class Checkpoint:
+    """Append-only record of finished brands so an interrupted batch can resume"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                lines = [line for line in f.read().split('\n') if line.strip()]
+            for i, line in enumerate(lines):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    if i < len(lines) - 1:
+                        raise
+                    # a batch killed while recording leaves a partial last line;
+                    # drop it, so the next record starts on a line of its own
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(''.join(line + '\n' for line in lines[:-1]))
+                    break
+                self.done[entry['brand']] = entry
+
+    def record(self, entry):
+        with self._lock:
+            self.done[entry['brand']] = entry
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+
+def make_crew(graph_workers=2, months=1, start=None, end=None, assemble=False):
+    # brands in the same vertical reuse each other's trend research through the index
+    return ContentCalendarCrew(parallel=True, shard_content=True, max_workers=graph_workers,
+                               months=months, start=start, end=end, assemble=assemble, index=semantic_index)
+
+
+def run_brand(slug, brand, output_dir, crew_factory, render_pool):
+    started = time.perf_counter()
+    crew = crew_factory()
+    result = crew.execute(brand)
+    pdf_path = os.path.join(output_dir, f"{slug}_content_calendar.pdf")
+    render_pool.submit(generate_pdf, result_text(result), pdf_path).result()
+    report_path = os.path.join(output_dir, f"{slug}_run_report.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(crew.last_report, f, indent=2)
+    return {"brand": slug, "pdf": pdf_path, "report": report_path, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def run_batch(brands, output_dir, concurrency=2, crew_factory=make_crew, log=print, render_processes=None):
+    """Generate one calendar PDF per brand through a bounded worker pool.
+
+    PDFs are rendered in a separate process pool so rendering runs on every
+    core while other brands are still generating. Brands already listed in
+    output_dir/checkpoint.jsonl are skipped. Returns a report with the
+    completed, skipped and failed brands and throughput.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(output_dir, 'checkpoint.jsonl'))
+
+    taken = set()
+    jobs = [(brand_slug(brand, taken), brand) for brand in brands]
+    todo = [(slug, brand) for slug, brand in jobs if slug not in checkpoint.done]
+    skipped = [slug for slug, _ in jobs if slug in checkpoint.done]
+
+    completed, failed = [], {}
+    started = time.perf_counter()
+
+    # render processes are spawned, as forking from a brand thread would copy
+    # the locks of every other thread (crews, event bus, health checks) in
+    # whatever state they are
+    spawn = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=render_processes, mp_context=spawn) as render_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(run_brand, slug, brand, output_dir, crew_factory, render_pool): slug
+                   for slug, brand in todo}
+        for future in as_completed(futures):
+            slug = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                failed[slug] = str(e)
+                log(f"failed {slug}: {e}")
+                continue
+            checkpoint.record(entry)
+            completed.append(slug)
+            log(f"done {slug} in {entry['seconds']}s ({len(completed)}/{len(todo)})")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "completed": completed,
+        "skipped": skipped,
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "calendars_per_hour": round(len(completed) * 3600 / elapsed, 2) if completed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate content calendars for many brands")
+    parser.add_argument('brands', help="CSV or JSONL file with one brand per row")
+    parser.add_argument('--out', default='calendars', help="directory for the PDFs and checkpoint")
+    parser.add_argument('--concurrency', type=int, default=2, help="brands generated at the same time")
+    parser.add_argument('--graph-workers', type=int, default=2, help="parallel tasks inside each crew")
+    parser.add_argument('--months', type=int, default=1, help="months each calendar covers")
+    parser.add_argument('--start', help="first month of the calendars (YYYY-MM-DD, default: this month)")
+    parser.add_argument('--end', help="last month of the calendars, instead of --months")
+    parser.add_argument('--assemble', action='store_true', help="build calendars without the packager agent")
+    parser.add_argument('--render-processes', type=int, help="processes rendering PDFs (default: one per core)")
+    args = parser.parse_args()
+
+    crew_factory = partial(make_crew, args.graph_workers, args.months, args.start, args.end, args.assemble)
+    report = run_batch(load_brands(args.brands), args.out, args.concurrency, crew_factory,
+                       render_processes=args.render_processes)
+    print(json.dumps(report, indent=2))
+    print(f"throughput: {report['calendars_per_hour']} calendars/hour")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate
+
+from file_generator import (create_header_footer, default_renderer, generate_pdf, parse_text_output,
+                            parse_text_output_regex, render_many, structured_data)
+from calendar_schema import CalendarData
+from fake_llm import QUALITIES, FakeLLMServer
+
+PLATFORM_NAMES = ['instagram', 'linkedin', 'twitter', 'facebook', 'tiktok']
+
+
+def synthetic_post(rng, number):
+    platform = rng.choice(PLATFORM_NAMES)
+    words = ' '.join(rng.choice(['grow', 'brand', 'today', 'launch', 'community', 'tips', '#1', 'story'])
+                     for _ in range(rng.randint(40, 90)))
+    tags = ' '.join(f"#{rng.choice(['marketing', 'growth', 'launch', 'brand', 'tips'])}{rng.randint(1, 99)}"
+                    for _ in range(rng.randint(3, 8)))
+    return f"""post {number}:
+platform: {platform}
+title: idea number {number} for {platform}
+content: {words}
+hashtags: {tags}
+posting day: monday
+posting time: 9:00 AM
+"""
+
+
+def synthetic_output(size, seed=0):
+    """Calendar text of roughly size bytes, shaped like a packager answer"""
+    rng = random.Random(seed)
+    parts = [
+        "BRAND INFORMATION:\nbrand name: Benchmark Brand\n",
+        "CONTENT PILLARS:\n" + ''.join(f"pillar {i}: theme {i}\ndescription: about theme {i}\n" for i in range(1, 6)),
+        "30+ SOCIAL MEDIA POSTS:\n",
+    ]
+    length = sum(len(part) for part in parts)
+    number = 1
+    while length < size:
+        post = synthetic_post(rng, number)
+        parts.append(post)
+        length += len(post)
+        number += 1
+    parts.append("HASHTAG BANK:\n" + ' '.join(f"#tag{i}" for i in range(30)) + "\n")
+    parts.append("POSTING SCHEDULE:\ninstagram daily 9 AM\n")
+    parts.append("KPI TARGETS:\nengagement rate: 5%\n")
+    return '\n'.join(parts)
+
+
+def synthetic_calendar(posts, seed=0):
+    """Calendar data dict whose posts are produced lazily by a generator"""
+    data = structured_data(CalendarData(brand_name="Benchmark Brand"))
+    data['stats'].update(total_posts=posts, platforms=len(PLATFORM_NAMES), posts_per_week=7)
+    rng = random.Random(seed)
+    data['posts'] = ({
+        "post_number": number,
+        "platform": rng.choice(PLATFORM_NAMES),
+        "title": f"idea number {number}",
+        "content": ' '.join(rng.choice(['grow', 'brand', 'today', 'launch', 'community', 'tips', 'story'])
+                            for _ in range(rng.randint(40, 90))),
+        "hashtags": [f"tag{rng.randint(1, 99)}" for _ in range(rng.randint(3, 8))],
+        "posting_day": "monday",
+        "posting_time": "9:00 AM",
+        "content_type": "educational",
+    } for number in range(1, posts + 1))
+    return data
+
+
+def render_streamed(data, path):
+    default_renderer().render(data, path)
+
+
+def render_list(data, path):
+    # the pre-streaming approach: materialize every flowable, then build once
+    doc = SimpleDocTemplate(path, pagesize=letter,
+                            rightMargin=0.75*inch, leftMargin=0.75*inch,
+                            topMargin=1*inch, bottomMargin=1*inch)
+    doc.build(list(default_renderer().flowables(data)),
+              onFirstPage=create_header_footer, onLaterPages=create_header_footer)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn(*args)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(seconds, 3), round(peak / 2**20, 1)
+
+
+def best_time(fn, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def bench_parser(sizes, repeat):
+    rows = []
+    for size in sizes:
+        text = synthetic_output(size)
+        row = {"bytes": len(text)}
+        for name, fn in (("single_pass", parse_text_output), ("regex", parse_text_output_regex)):
+            row[name] = round(best_time(fn, text, repeat), 4)
+        row["speedup"] = round(row["regex"] / row["single_pass"], 1) if row["single_pass"] else None
+        rows.append(row)
+        print(f"{row['bytes']:>9} bytes  single pass {row['single_pass']:.4f}s  regex {row['regex']:.4f}s  x{row['speedup']}")
+    return rows
+
+
+def bench_pdf(count, size, processes):
+    texts = [synthetic_output(size, seed) for seed in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"{i}.pdf") for i in range(count)]
+
+        started = time.perf_counter()
+        for text, path in zip(texts, paths):
+            generate_pdf(text, path)
+        serial = time.perf_counter() - started
+
+        started = time.perf_counter()
+        render_many(texts, paths, processes)
+        pooled = time.perf_counter() - started
+
+    row = {"pdfs": count, "bytes": size, "processes": processes or os.cpu_count(),
+           "serial": round(serial, 3), "render_many": round(pooled, 3),
+           "speedup": round(serial / pooled, 1)}
+    print(f"{count} pdfs  serial {row['serial']:.3f}s  render_many {row['render_many']:.3f}s "
+          f"({row['processes']} processes)  x{row['speedup']}")
+    return row
+
+
+def bench_pdf_stream(counts):
+    rows = []
+    default_renderer()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calendar.pdf")
+        for count in counts:
+            row = {"posts": count}
+            for name, fn in (("streamed", render_streamed), ("list", render_list)):
+                row[f"{name}_seconds"], row[f"{name}_peak_mb"] = measure(fn, synthetic_calendar(count), path)
+            rows.append(row)
+            print(f"{count:>5} posts  streamed {row['streamed_seconds']:.3f}s {row['streamed_peak_mb']:.1f} MB  "
+                  f"list {row['list_seconds']:.3f}s {row['list_peak_mb']:.1f} MB")
+    return rows
+
+
+BENCH_BRAND = {
+    "brand_name": "Benchmark Brand",
+    "industry": "coffee",
+    "target_audience": "remote workers",
+    "content_goals": "engagement",
+    "platforms": ["instagram", "linkedin", "tiktok"],
+}
+
+
+def fake_crew(server, mode):
+    # imported here so the other benchmarks don't load crewai
+    from crewai import LLM
+    from crew import ContentCalendarCrew
+    from llm_wrapper import StreamingLLM
+    from model_config import MODEL
+
+    crew = ContentCalendarCrew(parallel=mode == 'graph', shard_content=mode == 'graph')
+    llm = StreamingLLM(LLM(model=MODEL, base_url=server.url, temperature=0.9))
+    crew.agents.models = {role: llm for role in crew.agents.models}
+    return crew
+
+
+def content_text(result):
+    outputs = getattr(result, 'outputs', None)
+    return outputs['content'].raw if outputs else result.tasks_output[3].raw
+
+
+def filler_posts(data):
+    # parse_text_output pads calendars it could not find enough posts in
+    return sum(post['title'] == f"Engaging {post['platform'].title()} Content" for post in data['posts'])
+
+
+def run_fake_crew(server, mode, index):
+    crew = fake_crew(server, mode)
+    started = time.perf_counter()
+    # a brand per crew, as identical concurrent runs would be coalesced into one
+    result = crew.execute({**BENCH_BRAND, "brand_name": f"Benchmark Brand {index}"})
+    return result, time.perf_counter() - started, crew.last_report['totals']
+
+
+def bench_pipeline(mode, posts, qualities, concurrencies, delay, tokens_per_second):
+    """End-to-end execute, parse and pdf timings against a FakeLLMServer"""
+    rows = []
+    for count in posts:
+        for quality in qualities:
+            server = FakeLLMServer(delay=delay, tokens_per_second=tokens_per_second, posts=count,
+                                   quality=quality).start()
+            try:
+                for concurrency in concurrencies:
+                    requests = server.requests
+                    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                        runs = list(pool.map(lambda i: run_fake_crew(server, mode, i), range(concurrency)))
+                    result = runs[0][0]
+                    text = content_text(result)
+                    row = {
+                        "mode": mode, "posts": count, "quality": quality, "concurrency": concurrency,
+                        "execute_seconds": round(max(seconds for _, seconds, _ in runs), 3),
+                        "llm_calls": server.requests - requests,
+                        "llm_seconds": round(sum(totals['llm_seconds'] for _, _, totals in runs), 3),
+                        "parse_seconds": round(best_time(parse_text_output, text, 3), 4),
+                        "filler_posts": filler_posts(parse_text_output(text)),
+                        "pdf_seconds": round(best_time(generate_pdf, result, 3), 4),
+                    }
+                    rows.append(row)
+                    print(f"{mode} {count:>4} posts {quality:<8} x{concurrency}  execute {row['execute_seconds']:.3f}s "
+                          f"({row['llm_calls']} calls)  parse {row['parse_seconds']:.4f}s "
+                          f"({row['filler_posts']} filler)  pdf {row['pdf_seconds']:.4f}s")
+            finally:
+                server.stop()
+    return rows
+
+
+OTHER_BRAND = {
+    "brand_name": "Other Brand",
+    "industry": "fintech",
+    "target_audience": "small business owners",
+    "content_goals": "leads",
+    "platforms": ["instagram", "linkedin", "tiktok"],
+}
+
+
+def bench_construction(repeat):
+    """Per-run cost of building the crew's agents and tasks, and how much of
+    each task prompt is a prefix shared by different brands"""
+    from context_compaction import count_tokens
+    from crew import ContentCalendarCrew
+
+    rows = []
+    for mode in ('sequential', 'graph'):
+        parallel = mode == 'graph'
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            ContentCalendarCrew(parallel=parallel, shard_content=parallel).build_tasks(BENCH_BRAND, parallel)
+            times.append(time.perf_counter() - started)
+
+        crew = ContentCalendarCrew(parallel=parallel, shard_content=parallel)
+        ours, theirs = crew.build_tasks(BENCH_BRAND, parallel), crew.build_tasks(OTHER_BRAND, parallel)
+        shared = {}
+        for name, task in ours.items():
+            if name in theirs and hasattr(task, 'description'):
+                prefix = os.path.commonprefix([task.description, theirs[name].description])
+                shared[name] = f"{count_tokens(prefix)}/{count_tokens(task.description)}"
+
+        row = {"mode": mode, "build_ms": round(statistics.median(times) * 1000, 2), "shared_prefix_tokens": shared}
+        rows.append(row)
+        print(f"{mode:<10} build {row['build_ms']:.2f} ms/run  shared prompt prefix (tokens): "
+              f"{', '.join(f'{name} {tokens}' for name, tokens in shared.items())}")
+    return rows
+
+
+# what each process imports before it can do its work: the app imports
+# only streamlit and the job queue, workers load crewai, pdfs need reportlab
+STARTUP_IMPORTS = {
+    "app": "streamlit, jobs",
+    "worker": "crew",
+    "pdf": "file_generator",
+}
+
+
+def bench_startup(repeat):
+    """Import time of each process's modules, each run in a fresh interpreter"""
+    rows = []
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name, modules in STARTUP_IMPORTS.items():
+        code = f"import time; started = time.perf_counter(); import {modules}; print(time.perf_counter() - started)"
+        times = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True, text=True, check=True)
+            times.append(float(output.stdout.strip().splitlines()[-1]))
+        row = {"process": name, "imports": modules, "best": round(min(times), 3),
+               "median": round(statistics.median(times), 3)}
+        rows.append(row)
+        print(f"{name:<7} import {modules:<16} best {row['best']:.3f}s  median {row['median']:.3f}s")
+    return rows
+
+
+SCENARIO = ('mode', 'posts', 'quality', 'concurrency')
+
+
+def compare(rows, baseline_path):
+    """Print the change of every timing against a previous --json run of the same scenarios"""
+    with open(baseline_path) as f:
+        baseline = {tuple(row[k] for k in SCENARIO): row for row in json.load(f)['pipeline']}
+    for row in rows:
+        before = baseline.get(tuple(row[k] for k in SCENARIO))
+        if before is None:
+            continue
+        changes = [f"{key} {(row[key] - before[key]) / before[key]:+.0%}"
+                   for key in row if key.endswith('_seconds') and before.get(key)]
+        print(f"{' '.join(str(row[k]) for k in SCENARIO)}  vs baseline: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmarks for the non-llm hot paths")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    parse_cmd = sub.add_parser('parser', help="single pass vs regex calendar text parser")
+    parse_cmd.add_argument('--sizes', default='100000,1000000,5000000', help="comma separated output sizes in bytes")
+    parse_cmd.add_argument('--repeat', type=int, default=3)
+
+    pdf_cmd = sub.add_parser('pdf', help="serial generate_pdf vs render_many over a process pool")
+    pdf_cmd.add_argument('--count', type=int, default=50, help="number of calendars")
+    pdf_cmd.add_argument('--size', type=int, default=20000, help="calendar text size in bytes")
+    pdf_cmd.add_argument('--processes', type=int, help="pool size (default: one per core)")
+
+    stream_cmd = sub.add_parser('pdf-stream', help="time and peak memory of streamed vs list PDF building")
+    stream_cmd.add_argument('--posts', default='30,365,3000', help="comma separated post counts")
+
+    pipeline_cmd = sub.add_parser('pipeline', help="execute, parse and pdf end to end against a fake llm")
+    pipeline_cmd.add_argument('--mode', choices=['sequential', 'graph'], default='graph')
+    pipeline_cmd.add_argument('--posts', default='5,30', help="comma separated posts per canned answer")
+    pipeline_cmd.add_argument('--quality', default=','.join(QUALITIES), help="comma separated answer formats")
+    pipeline_cmd.add_argument('--concurrency', default='1,4', help="comma separated numbers of concurrent crews")
+    pipeline_cmd.add_argument('--delay', type=float, default=0.05, help="seconds before each completion starts")
+    pipeline_cmd.add_argument('--tokens-per-second', type=float, default=2000.0, help="fake generation speed")
+    pipeline_cmd.add_argument('--baseline', help="--json output of an earlier run to compare against")
+
+    startup_cmd = sub.add_parser('startup', help="cold import time of the app, worker and pdf modules")
+    startup_cmd.add_argument('--repeat', type=int, default=5)
+
+    construction_cmd = sub.add_parser('construction', help="per-run agent and task construction overhead")
+    construction_cmd.add_argument('--repeat', type=int, default=50)
+
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.command == 'parser':
+        results = bench_parser([int(size) for size in args.sizes.split(',')], args.repeat)
+    elif args.command == 'pdf':
+        results = bench_pdf(args.count, args.size, args.processes)
+    elif args.command == 'pdf-stream':
+        results = bench_pdf_stream([int(posts) for posts in args.posts.split(',')])
+    elif args.command == 'pipeline':
+        results = bench_pipeline(args.mode, [int(posts) for posts in args.posts.split(',')], args.quality.split(','),
+                                 [int(n) for n in args.concurrency.split(',')], args.delay, args.tokens_per_second)
+        if args.baseline:
+            compare(results, args.baseline)
+    elif args.command == 'construction':
+        results = bench_construction(args.repeat)
+    elif args.command == 'startup':
+        results = bench_startup(args.repeat)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({args.command: results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
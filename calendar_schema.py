@@ -0,0 +1,78 @@
+import json
+from typing import List
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+
+class Stats(BaseModel):
+    total_posts: int = 0
+    platforms: int = 0
+    posts_per_week: int = 0
+    content_themes: int = 0
+
+
+class Pillar(BaseModel):
+    title: str
+    description: str = ""
+
+
+class Post(BaseModel):
+    post_number: int
+    platform: str
+    title: str
+    content: str
+    hashtags: List[str] = []
+    posting_day: str = ""
+    posting_time: str = ""
+    content_type: str = ""
+    month: str = ""
+
+    @field_validator('platform')
+    @classmethod
+    def normalize_platform(cls, value):
+        return value.strip().lower()
+
+    @field_validator('hashtags')
+    @classmethod
+    def strip_hash(cls, value):
+        return [tag.strip().lstrip('#') for tag in value if tag.strip().lstrip('#')]
+
+
+class ScheduleEntry(BaseModel):
+    platform: str
+    frequency: str
+    best_times: str
+    content_type: str
+
+
+class KPI(BaseModel):
+    metric: str
+    target: str
+
+
+class CalendarData(BaseModel):
+    """Structured output of the package_calendar task, consumed by generate_pdf"""
+    brand_name: str
+    month: str = ""
+    stats: Stats = Stats()
+    content_pillars: List[Pillar] = []
+    posts: List[Post] = []
+    hashtag_bank: List[str] = []
+    posting_schedule: List[ScheduleEntry] = []
+    kpi_targets: List[KPI] = []
+
+    @field_validator('hashtag_bank')
+    @classmethod
+    def strip_hash(cls, value):
+        return [tag.strip().lstrip('#') for tag in value if tag.strip().lstrip('#')]
+
+
+def parse_calendar_json(text):
+    """Validate the JSON object in a model answer; None if there isn't a valid one"""
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        return CalendarData.model_validate(json.loads(text[start:end + 1]))
+    except (ValueError, ValidationError):
+        return None
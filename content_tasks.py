@@ -1,136 +1,149 @@
 from crewai import Task
+from calendar_schema import CalendarData
+from prompt_templates import task_templates
+
+
+BRAND_FIELDS = {
+    'brand_name': ('brand name', 'not specified'),
+    'industry': ('industry', 'not specified'),
+    'brand_voice': ('brand voice', 'not specified'),
+    'target_audience': ('target audience', 'not specified'),
+    'content_goals': ('content goals', 'not specified'),
+    'platforms': ('platforms', 'not specified'),
+    'posting_frequency': ('posting frequency', 'not specified'),
+    'content_themes': ('content themes', 'not specified'),
+    'brand_values': ('brand values', 'not specified'),
+    'competitors': ('competitors', 'not specified'),
+    'special_events': ('upcoming events', 'none'),
+    'avoid_topics': ('avoid topics', 'none'),
+}
+
+# brand input fields each stage reads; editing a field only invalidates the
+# stages that list it and whatever runs downstream of them
+STAGE_FIELDS = {
+    'brand': ['brand_name', 'industry', 'brand_voice', 'target_audience', 'content_goals',
+              'content_themes', 'brand_values', 'competitors'],
+    'trends': ['industry', 'target_audience', 'platforms'],
+    'strategy': ['platforms', 'posting_frequency', 'special_events'],
+    'content': ['platforms', 'avoid_topics'],
+    'calendar': ['brand_name', 'platforms', 'posting_frequency'],
+}
+
+
+def format_field(name, value):
+    label, default = BRAND_FIELDS[name]
+    if isinstance(value, (list, tuple)):
+        value = ', '.join(value)
+    if name == 'posting_frequency' and value:
+        value = f"{value} posts per week"
+    return f"{label}: {value or default}"
+
+
+def render_brand_input(brand_input, stage=None):
+    """Render brand input fields as prompt text, optionally only those a stage reads"""
+    if not isinstance(brand_input, dict):
+        return str(brand_input)
+    names = STAGE_FIELDS[stage] if stage else list(BRAND_FIELDS)
+    return '\n'.join(format_field(name, brand_input.get(name)) for name in names)
+
+
+# sections appended after a task's static instructions, ordered from the
+# ones shared by most runs (platform, month) to the most brand-specific
+
+def brand_details_section(brand_details):
+    return f"brand details:\n{brand_details}" if brand_details else None
+
+
+def month_section(month):
+    return f"these posts are for {month}; follow the {month} section of the strategy." if month else None
+
+
+def seed_section(seed, kind):
+    if not seed:
+        return None
+    return (f"a {kind} written for a similar brand is below. keep what applies here, "
+            f"correct what doesn't and add what is missing rather than starting over:\n{seed}")
+
+
+def niche_hint(brand_input):
+    """Pull the industry, audience and platform lines out of the brand input"""
+    if isinstance(brand_input, dict):
+        return render_brand_input(brand_input, 'trends')
+    hint = [
+        line.strip() for line in str(brand_input).splitlines()
+        if line.strip().lower().startswith(('industry:', 'target audience:', 'platforms:'))
+    ]
+    return '\n'.join(hint) or str(brand_input)
 
 
 class ContentCalendarTasks:
-    def analyze_brand(self, agent, brand_input):
+    def __init__(self, templates=None):
+        # compiled once at import, see prompt_templates
+        self.templates = templates or task_templates
+
+    def analyze_brand(self, agent, brand_input, seed=None):
+        template = self.templates['analyze_brand']
         return Task(
-            description=f"""
-            analyze the brand and create comprehensive brand profile.
-            
-            extract and define:
-            1. brand voice and tone
-            2. target audience demographics
-            3. content pillars and themes
-            4. brand values and messaging
-            5. competitor analysis
-            
-            brand information: {brand_input}
-            
-            format output as detailed brand profile with clear guidelines.
-            """,
+            description=template.render(f"brand information:\n{brand_input}", seed_section(seed, "brand profile")),
             agent=agent,
-            expected_output="comprehensive brand profile with voice guidelines and audience insights"
+            expected_output=template.expected()
         )
-    
-    def research_trends(self, agent, context):
+
+    def research_trends(self, agent, context, niche=None, seed=None):
+        template = self.templates['research_trends']
         return Task(
-            description="""
-            research current social media trends and opportunities.
-            
-            identify:
-            1. trending topics relevant to brand niche
-            2. popular hashtags and keywords
-            3. viral content formats
-            4. seasonal opportunities and events
-            5. content gaps in the market
-            
-            provide specific trend insights with examples.
-            """,
+            description=template.render(niche and f"brand niche:\n{niche}", seed_section(seed, "trend report")),
             agent=agent,
             context=context,
-            expected_output="trend research report with actionable content opportunities"
+            expected_output=template.expected()
         )
-    
-    def create_strategy(self, agent, context):
+
+    def create_strategy(self, agent, context, brand_details=None, months=None):
+        # a multi-month horizon gets one shared plan with a section per month,
+        # which each month's copywriter then follows
+        if months and len(months) > 1:
+            template = self.templates['create_multi_month_strategy']
+            plan = f"plan {len(months)} months: {', '.join(months)}."
+        else:
+            template, plan = self.templates['create_strategy'], None
         return Task(
-            description="""
-            develop strategic content calendar framework.
-            
-            create:
-            1. content themes for each week
-            2. posting frequency per platform
-            3. content mix ratios
-            4. optimal posting times
-            5. content series and campaigns
-            
-            organize into monthly calendar structure with clear schedule.
-            """,
+            description=template.render(plan, brand_details_section(brand_details)),
             agent=agent,
             context=context,
-            expected_output="strategic content calendar framework with themes and schedule"
+            expected_output=template.expected(count=len(months or ()))
         )
-    
-    def write_content(self, agent, context):
+
+    def write_content(self, agent, context, brand_details=None, month=None):
+        template = self.templates['write_content']
         return Task(
-            description="""
-            write 30+ social media posts for the content calendar.
-            
-            create posts for each platform:
-            - linkedin: professional insights
-            - twitter: quick tips and threads
-            - instagram: visual captions
-            - facebook: community engagement
-            - tiktok: trending formats
-            
-            each post must include:
-            - platform-optimized copy
-            - suggested hashtags
-            - call to action
-            - best posting time
-            - content type
-            
-            write minimum 30 complete posts covering full month.
-            """,
+            description=template.render(month_section(month), brand_details_section(brand_details)),
             agent=agent,
             context=context,
-            expected_output="30+ platform-optimized social media posts with hashtags and timing"
+            expected_output=template.expected()
         )
-    
-    def package_calendar(self, agent, context):
+
+    def write_platform_content(self, agent, context, platform, count, brand_details=None, month=None):
+        template = self.templates['write_platform_content']
         return Task(
-            description="""
-create a complete 30-day social media content calendar.
-
-compile all the content into a structured format with:
-
-BRAND INFORMATION:
-- brand name
-- month and year
-- total statistics (30+ posts, number of platforms, posts per week, content themes count)
-
-CONTENT PILLARS (4-6 pillars):
-for each pillar provide:
-- pillar name
-- description
-
-30+ SOCIAL MEDIA POSTS:
-for each post provide:
-- post number (1-30+)
-- platform (linkedin, twitter, instagram, facebook, or tiktok)
-- post title (catchy and engaging)
-- full post content (minimum 50 words, engaging copy)
-- 5-10 relevant hashtags
-- posting day (monday-sunday)
-- posting time (specific time like 9:00 AM)
-- content type (educational, promotional, entertaining, etc)
-
-HASHTAG BANK:
-- list of 20-30 relevant hashtags for the brand
-
-POSTING SCHEDULE:
-for each platform provide:
-- platform name
-- posting frequency (daily, 3x week, etc)
-- best posting times
-- content type focus
-
-KPI TARGETS (6-8 metrics):
-- metric name
-- target value
-
-organize everything clearly and make sure all 30+ posts are complete with engaging content that matches the brand voice and goals.
-            """,
+            description=template.render(
+                f"platform: {platform}\nnumber of posts: {count}",
+                month_section(month),
+                brand_details_section(brand_details)
+            ),
             agent=agent,
             context=context,
-            expected_output="complete organized content calendar with brand info, 30+ detailed posts with full content and hashtags, content pillars, hashtag bank, posting schedule, and KPI targets"
-        )
\ No newline at end of file
+            expected_output=template.expected(count=count, platform=platform)
+        )
+
+    def package_calendar(self, agent, context, brand_details=None, month=None):
+        template = self.templates['package_calendar']
+        return Task(
+            description=template.render(
+                month and f'the calendar is for {month}; use "{month}" as the month and year.',
+                brand_details_section(brand_details)
+            ),
+            agent=agent,
+            context=context,
+            expected_output=template.expected(),
+            output_pydantic=CalendarData
+        )
@@ -0,0 +1,104 @@
+import os
+import re
+
+# estimated token budget for the upstream context of each kind of stage;
+# post copy is passed whole, the budget covers the other upstream outputs
+DEFAULT_BUDGETS = {
+    'trends': 600,
+    'strategy': 1200,
+    'content': 1500,
+    'calendar': 1000,
+}
+
+# upstream outputs a stage receives in full: the packager has to see every post
+UNCOMPACTED = {'content'}
+
+HEADING = re.compile(r'^\s*(#+\s*\S.*|\*\*[^*]+\*\*:?|[A-Za-z][^.!?]{0,60}:)\s*$')
+ITEM = re.compile(r'^\s*([-*•]|\d+[.)])\s+')
+MARKUP = re.compile(r'\*\*|__|`')
+
+
+def count_tokens(text):
+    """Rough token estimate (about four characters per token for English)"""
+    return (len(text) + 3) // 4
+
+
+def stage_kind(name):
+    """content_2025_03_instagram -> content"""
+    return name.split('_')[0]
+
+
+def stage_budgets():
+    """DEFAULT_BUDGETS with CONTEXT_BUDGET_<STAGE> environment overrides"""
+    budgets = dict(DEFAULT_BUDGETS)
+    for kind in budgets:
+        value = os.getenv(f"CONTEXT_BUDGET_{kind.upper()}")
+        if value:
+            budgets[kind] = int(value)
+    return budgets
+
+
+def sections(text):
+    """Split text into (heading, items) sections; lines before any heading get heading None"""
+    result = [[None, []]]
+    for line in text.splitlines():
+        line = MARKUP.sub('', line).rstrip()
+        if not line.strip():
+            continue
+        if HEADING.match(line) and not ITEM.match(line):
+            result.append([line.strip(), []])
+        else:
+            result[-1][1].append(line.strip())
+    return [(heading, items) for heading, items in result if heading or items]
+
+
+def digest(text, budget):
+    """Shrink text to about `budget` tokens, keeping every heading and the
+    first items of each section, so a long report keeps its top-N points
+    per section rather than just its opening paragraphs."""
+    if count_tokens(text) <= budget:
+        return text
+
+    parts = sections(text)
+    used = sum(count_tokens(heading) for heading, _ in parts if heading)
+    kept = [[] for _ in parts]
+    # take the first item of every section, then the second, and so on
+    for rank in range(max(len(items) for _, items in parts)):
+        for i, (_, items) in enumerate(parts):
+            if rank >= len(items):
+                continue
+            cost = count_tokens(items[rank])
+            if used + cost > budget:
+                return join_sections(parts, kept)
+            kept[i].append(items[rank])
+            used += cost
+    return join_sections(parts, kept)
+
+
+def join_sections(parts, kept):
+    lines = []
+    for (heading, _), items in zip(parts, kept):
+        if heading:
+            lines.append(heading)
+        lines.extend(items)
+    return '\n'.join(lines)
+
+
+def compact(name, upstream, budgets):
+    """Compact the (upstream name, raw output) pairs a stage reads.
+
+    The stage's budget is shared evenly by the upstream outputs it may
+    shrink. Returns the compacted texts and the estimated tokens before
+    and after.
+    """
+    texts = [raw for _, raw in upstream]
+    before = sum(count_tokens(text) for text in texts)
+
+    budget = budgets.get(stage_kind(name))
+    shrinkable = [i for i, (upstream_name, _) in enumerate(upstream) if stage_kind(upstream_name) not in UNCOMPACTED]
+    if budget and shrinkable:
+        share = budget // len(shrinkable)
+        for i in shrinkable:
+            texts[i] = digest(texts[i], share)
+
+    return texts, before, sum(count_tokens(text) for text in texts)
@@ -1,56 +1,324 @@
 from crewai import Crew, Process
 from agents import ContentCalendarAgents
-from content_tasks import ContentCalendarTasks
+from content_tasks import ContentCalendarTasks, niche_hint, render_brand_input
+from assembler import assemble_calendar
+from context_compaction import stage_budgets
+from file_generator import merge_month_calendars
+from horizon import horizon_label, horizon_months, month_key, month_label
+from instrumentation import RunRecorder, crewai_event_bus
+from output_limits import stage_limits, stage_output_budgets
+from post_repair import repair_posts
+from scheduler import LocalStep, fingerprint, listening_with, run_graph
+from semantic_index import industry_scope, seed_texts, stage_queries
+from shards import merge_post_shards, platforms_from_input, posts_per_shard
+from singleflight import SingleFlight
 import os
+import queue
+import threading
 
 os.environ["CREWAI_TELEMETRY_ENABLED"] = "false"
 
+# execute() calls for the same brand input and crew settings that overlap
+# share one run
+runs = SingleFlight()
+
 
 class ContentCalendarCrew:
-    def __init__(self):
+    def __init__(self, parallel=False, max_workers=4, shard_content=False, total_posts=30, store=None,
+                 months=1, start=None, end=None, compact_context=True, context_budgets=None, assemble=False,
+                 index=None, limit_output=True, output_budgets=None, repair=True):
         self.agents = ContentCalendarAgents()
         self.tasks = ContentCalendarTasks()
-    
-    def build_crew(self, brand_input):
+        self.parallel = parallel
+        self.max_workers = max_workers
+        self.shard_content = shard_content
+        self.total_posts = total_posts
+        self.store = store
+        # SemanticIndex of past brand and trend outputs, reused or used as a
+        # seed in graph runs for similar brands
+        self.index = index
+        self.months = horizon_months(months, start, end)
+        # graph runs hand each stage a digest of its upstream outputs that
+        # fits the stage's token budget instead of the outputs in full
+        self.context_budgets = (context_budgets or stage_budgets()) if compact_context else None
+        # graph runs stop each stage's generation once it has the posts it
+        # needs or reaches its estimated token budget, see output_limits
+        self.output_budgets = (output_budgets or stage_output_budgets()) if limit_output else None
+        # build the calendar from the copy in python instead of the packager agent
+        self.assemble = assemble
+        # graph runs write again only the posts missing or malformed in the
+        # copy, see post_repair
+        self.repair = repair
+        # run report of the last execute() or stream(), see instrumentation
+        self.last_report = None
+
+    def build_tasks(self, brand_input, parallel=False, seeds=None):
+        # a dict of brand fields lets each stage see only the fields it reads,
+        # so an edit only changes the prompts (and stored outputs) it affects
+        scoped = parallel and isinstance(brand_input, dict)
+
+        def details(stage):
+            return render_brand_input(brand_input, stage) if scoped else None
+
+        seeds = seeds or {}
+        labels = [month_label(month) for month in self.months]
         brand_analyst = self.agents.brand_analyzer()
         trend_researcher = self.agents.trend_researcher()
         strategist = self.agents.content_strategist()
-        writer = self.agents.copywriter()
-        packager = self.agents.calendar_packager()
-        
+
         brand_task = self.tasks.analyze_brand(
             agent=brand_analyst,
-            brand_input=brand_input
+            brand_input=render_brand_input(brand_input, 'brand' if scoped else None),
+            seed=seeds.get('brand')
         )
-        
-        trend_task = self.tasks.research_trends(
-            agent=trend_researcher,
-            context=[brand_task]
-        )
-        
+
+        # trend research only needs the niche, so in parallel mode it starts
+        # alongside the brand analysis instead of waiting for it
+        if parallel:
+            trend_task = self.tasks.research_trends(
+                agent=trend_researcher,
+                context=[],
+                niche=niche_hint(brand_input),
+                seed=seeds.get('trends')
+            )
+        else:
+            trend_task = self.tasks.research_trends(
+                agent=trend_researcher,
+                context=[brand_task]
+            )
+
         strategy_task = self.tasks.create_strategy(
             agent=strategist,
-            context=[brand_task, trend_task]
+            context=[brand_task, trend_task],
+            brand_details=details('strategy'),
+            months=labels
         )
-        
-        content_task = self.tasks.write_content(
-            agent=writer,
-            context=[brand_task, trend_task, strategy_task]
+
+        upstream = [brand_task, trend_task, strategy_task]
+        steps = {
+            "brand": brand_task,
+            "trends": trend_task,
+            "strategy": strategy_task,
+        }
+
+        if len(self.months) == 1:
+            steps.update(self.content_steps("content", upstream, brand_input, parallel, details))
+            steps["calendar"] = self.package_step(upstream, steps["content"], brand_input, details, labels[0])
+            return steps
+
+        # every month is written and packaged on its own branch of the graph,
+        # all following the shared strategy, then merged into one calendar
+        calendars = []
+        for month, label in zip(self.months, labels):
+            key = month_key(month)
+            steps.update(self.content_steps(f"content_{key}", upstream, brand_input, parallel, details, label))
+            steps[f"calendar_{key}"] = self.package_step(upstream, steps[f"content_{key}"], brand_input, details,
+                                                         label)
+            calendars.append(steps[f"calendar_{key}"])
+        horizon = horizon_label(self.months)
+        steps["calendar"] = LocalStep(lambda texts: merge_month_calendars(labels, texts, horizon), context=calendars)
+        return steps
+
+    def repair_step(self, drafts, upstream, brand_input, month, merge):
+        """LocalStep repairing the (task, platforms, count) drafts and merging their texts"""
+        if not self.repair:
+            return LocalStep(merge, context=[task for task, _, _ in drafts])
+
+        def repair(texts):
+            strategy, texts = texts[0], texts[1:]
+            return merge(repair_posts(
+                self.agents.models['copywriter'],
+                [(text, platforms, count) for text, (_, platforms, count) in zip(texts, drafts)],
+                strategy,
+                brand_details=render_brand_input(brand_input, 'brand'),
+                month=month
+            ))
+
+        return LocalStep(repair, context=[upstream[-1]] + [task for task, _, _ in drafts])
+
+    def content_steps(self, name, upstream, brand_input, parallel, details, month=None):
+        platforms = platforms_from_input(render_brand_input(brand_input))
+        if not (parallel and self.shard_content):
+            task = self.tasks.write_content(
+                agent=self.agents.copywriter(),
+                context=upstream,
+                brand_details=details('content'),
+                month=month
+            )
+            if not (parallel and self.repair):
+                return {name: task}
+            # the draft is repaired in python before anything reads it
+            return {
+                f"{name}_draft": task,
+                name: self.repair_step([(task, platforms, self.total_posts)], upstream, brand_input, month,
+                                       lambda texts: texts[0]),
+            }
+
+        count = posts_per_shard(self.total_posts, len(platforms))
+        # one smaller generation per platform; each shard gets its own
+        # agent so the shards can run concurrently
+        shards = {
+            f"{name}_{platform}": self.tasks.write_platform_content(
+                agent=self.agents.copywriter(),
+                context=upstream,
+                platform=platform,
+                count=count,
+                brand_details=details('content'),
+                month=month
+            )
+            for platform in platforms
+        }
+        merged = self.repair_step(
+            [(task, [platform], count) for platform, task in zip(platforms, shards.values())],
+            upstream, brand_input, month,
+            lambda texts: merge_post_shards(zip(platforms, texts))
         )
-        
-        calendar_task = self.tasks.package_calendar(
-            agent=packager,
-            context=[brand_task, trend_task, strategy_task, content_task]
+        return {**shards, name: merged}
+
+    def package_step(self, upstream, content, brand_input, details, month):
+        if self.assemble:
+            return LocalStep(
+                lambda texts: assemble_calendar(brand_input, month, *texts),
+                context=upstream + [content]
+            )
+        return self.tasks.package_calendar(
+            agent=self.agents.calendar_packager(),
+            context=upstream + ([] if isinstance(content, LocalStep) else [content]),
+            brand_details=details('calendar'),
+            month=month
         )
-        
+
+    def graph_dependencies(self, steps):
+        # merged shards are a LocalStep, which crewai won't accept in a task
+        # context, so a packager reading them gets its full upstream by name
+        depends_on = {}
+        for name, step in steps.items():
+            content = "content" + name[len("calendar"):]
+            if name.startswith("calendar") and not isinstance(step, LocalStep) \
+                    and isinstance(steps.get(content), LocalStep):
+                depends_on[name] = ["brand", "trends", "strategy", content]
+        return depends_on or None
+
+    def needs_graph(self):
+        """Multi-month and assembled calendars include python steps, which only the graph runs"""
+        return len(self.months) > 1 or self.assemble
+
+    def build_crew(self, brand_input):
+        if self.needs_graph():
+            raise ValueError("multi-month and assembled calendars run as a task graph, use execute() or run_graph()")
+        tasks = list(self.build_tasks(brand_input).values())
+
         return Crew(
-            agents=[brand_analyst, trend_researcher, strategist, writer, packager],
-            tasks=[brand_task, trend_task, strategy_task, content_task, calendar_task],
+            agents=[task.agent for task in tasks],
+            tasks=tasks,
             process=Process.sequential,
             verbose=False
         )
-    
+
+    def output_limits(self, steps, brand_input):
+        if self.output_budgets is None:
+            return None
+        # shards write a share of the posts each, unsharded copy up to the parser's maximum
+        posts = posts_per_shard(self.total_posts, len(platforms_from_input(render_brand_input(brand_input)))) \
+            if self.shard_content else None
+        llm_steps = [name for name, step in steps.items() if not isinstance(step, LocalStep)]
+        return stage_limits(llm_steps, posts, self.output_budgets)
+
+    def run_graph(self, brand_input, listener=None):
+        queries = stage_queries(brand_input) if self.index is not None else {}
+        # past outputs are only recalled for a brand in the same industry, as a
+        # shared audience alone makes brands look alike
+        scope = industry_scope(brand_input)
+        matches, seeds = self.index.recall(queries, scope) if queries else ({}, {})
+        steps = self.build_tasks(brand_input, parallel=True, seeds=seed_texts(seeds))
+        recorder = RunRecorder()
+
+        def record(event):
+            recorder.record(event)
+            if listener is not None:
+                listener(event)
+
+        result = run_graph(steps, max_workers=self.max_workers, depends_on=self.graph_dependencies(steps),
+                           store=self.store, listener=record, budgets=self.context_budgets,
+                           recalled={stage: match.value for stage, match in matches.items()},
+                           limits=self.output_limits(steps, brand_input))
+        result.recalled = {stage: round(match.similarity, 3) for stage, match in matches.items()}
+        for stage, query in queries.items():
+            if stage not in matches:
+                source = seeds[stage].query if stage in seeds else ''
+                self.index.add(stage, query, result.outputs[stage].raw, scope, source)
+        # llm call events are handled on the event bus threads and may still be in flight
+        crewai_event_bus.flush()
+        result.report = self.last_report = recorder.report()
+        return result
+
+    def settings(self):
+        return {
+            "parallel": self.parallel or self.needs_graph(),
+            "shard_content": self.shard_content,
+            "total_posts": self.total_posts,
+            "months": [str(month) for month in self.months],
+            "context_budgets": self.context_budgets,
+            "output_budgets": self.output_budgets,
+            "assemble": self.assemble,
+            "repair": self.repair,
+            "index": getattr(self.index, 'path', None),
+            "models": {role: (llm.model, llm.base_url, llm.temperature, llm.max_tokens)
+                       for role, llm in self.agents.models.items()},
+        }
+
     def execute(self, brand_input):
+        """Run the crew; a call identical to one still running waits for its result"""
+
+        def run():
+            return self.run(brand_input), self.last_report
+
+        result, self.last_report = runs.do(fingerprint(brand_input, self.settings()), run)
+        return result
+
+    def run(self, brand_input):
+        if self.parallel or self.needs_graph():
+            return self.run_graph(brand_input)
+
         crew = self.build_crew(brand_input)
-        result = crew.kickoff()
+        # a sequential crew has no stages, so its report only breaks down by agent
+        recorder = RunRecorder()
+        with listening_with(recorder.record):
+            result = crew.kickoff()
+            crewai_event_bus.flush()
+        self.last_report = recorder.report()
         return result
+
+    def stream(self, brand_input):
+        """Run the task graph in the background and yield its progress events.
+
+        Yields dicts with a 'type' of stage_started, context_compacted (with
+        estimated 'before' and 'after' tokens), token (with 'text') and
+        stage_finished (with 'seconds'), each tagged with its 'stage', along
+        with llm_started, llm_call and llm_failed events from the llm calls
+        and posts_repaired from the copy's repair step, then a final
+        {'type': 'result', 'result': ...} whose result carries the run
+        report. Errors are re-raised here.
+        """
+        events = queue.Queue()
+        outcome = {}
+
+        def work():
+            try:
+                outcome["result"] = self.run_graph(brand_input, listener=events.put)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                events.put(None)
+
+        threading.Thread(target=work, daemon=True).start()
+
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield event
+
+        if "error" in outcome:
+            raise outcome["error"]
+        yield {"type": "result", "stage": None, "result": outcome["result"]}
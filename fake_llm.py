@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PLATFORMS = ['instagram', 'linkedin', 'twitter', 'facebook', 'tiktok']
+WORDS = ['grow', 'brand', 'today', 'launch', 'community', 'tips', 'story', 'behind', 'scenes', 'new', 'how', 'why']
+QUALITIES = ('clean', 'markdown', 'messy')
+
+
+def fake_posts(rng, count):
+    posts = []
+    for number in range(1, count + 1):
+        posts.append({
+            "post_number": number,
+            "platform": rng.choice(PLATFORMS),
+            "title": ' '.join(rng.choice(WORDS) for _ in range(4)),
+            "content": ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))),
+            "hashtags": [f"{rng.choice(WORDS)}{rng.randint(1, 99)}" for _ in range(rng.randint(2, 6))],
+            "posting_day": rng.choice(['monday', 'wednesday', 'friday']),
+            "posting_time": f"{rng.randint(8, 18)}:00",
+        })
+    return posts
+
+
+def format_post(post, quality):
+    """A post the way a model might write it: clean labels, markdown, or loosely formatted"""
+    tags = ' '.join('#' + tag for tag in post['hashtags'])
+    if quality == 'markdown':
+        return (f"**Post {post['post_number']}:**\n**Platform:** {post['platform'].title()}\n"
+                f"**Title:** {post['title']}\n**Content:** {post['content']}\n**Hashtags:** {tags}\n"
+                f"**Posting day:** {post['posting_day'].title()}\n**Posting time:** {post['posting_time']}")
+    if quality == 'messy':
+        return (f"Post {post['post_number']} - {post['platform']}\n{post['title'].upper()}\n"
+                f"{post['content']}\n\n{tags}")
+    return (f"post {post['post_number']}:\nplatform: {post['platform']}\ntitle: {post['title']}\n"
+            f"content: {post['content']}\nhashtags: {tags}\nposting day: {post['posting_day']}\n"
+            f"posting time: {post['posting_time']}")
+
+
+def fake_answer(messages, structured=False, posts=1, quality='clean'):
+    """Agent-shaped answer: calendar JSON when the prompt asks for it, else posts.
+
+    Answers are seeded by the prompt, so the same request always gets the
+    same text. posts sets their size and quality their formatting (see
+    QUALITIES). Requests with a response_format get the bare JSON, as a
+    real server constrained to the schema would return.
+    """
+    prompt = ' '.join(str(message.get('content', '')) for message in messages)
+    rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+    calendar = json.dumps({"brand_name": "Fake Brand", "posts": fake_posts(rng, posts)})
+    if structured:
+        return calendar
+    body = calendar if 'JSON' in prompt else '\n\n'.join(format_post(post, quality) for post in fake_posts(rng, posts))
+    return f"Thought: I now know the final answer\nFinal Answer: {body}"
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Answers the Ollama and OpenAI-compatible endpoints crewai and the backend pool use"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.server.down:
+            return self.send_json({"error": "down"}, 503)
+        if self.path.rstrip('/') == '/api/tags':
+            return self.send_json({"models": [{"name": self.server.model}]})
+        if self.path.rstrip('/') == '/v1/models':
+            return self.send_json({"object": "list", "data": [{"id": self.server.model, "object": "model"}]})
+        self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if self.server.down:
+            return self.send_json({"error": "down"}, 503)
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            return self.send_json({"error": "not found"}, 404)
+
+        with self.server.lock:
+            self.server.requests += 1
+
+        answer = fake_answer(request.get('messages', []), bool(request.get('response_format')),
+                             self.server.posts, self.server.quality)
+        # like a real server, end the answer where a stop sequence begins
+        for stop in request.get('stop') or []:
+            answer = answer.split(stop, 1)[0]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        usage = {"prompt_tokens": length // 4, "completion_tokens": len(answer) // 4,
+                 "total_tokens": length // 4 + len(answer) // 4}
+        time.sleep(self.server.delay)
+        if request.get('stream'):
+            return self.stream(completion_id, request.get('model'), answer, usage)
+        time.sleep(self.server.generation_seconds(usage["completion_tokens"]))
+
+        self.send_json({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model'),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def stream(self, completion_id, model, answer, usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+
+        def chunk(delta, finish_reason=None, **extra):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                       **extra}
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+
+        pause = self.server.generation_seconds(4)
+        for start in range(0, len(answer), 16):
+            time.sleep(pause)
+            chunk({"content": answer[start:start + 16]})
+        chunk({}, "stop", usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Local stand-in for an Ollama server, for exercising the app without a model.
+
+    delay is the seconds before every completion starts and tokens_per_second
+    the pace it is generated at (unlimited if None). posts and quality shape
+    the canned answers, see fake_answer. Set down to make the server answer
+    503 so failover and health checks can be tried out.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.0, model="llama3.2:3b", tokens_per_second=None, posts=1, quality='clean'):
+        if quality not in QUALITIES:
+            raise ValueError(f"unknown answer quality '{quality}', expected one of: {', '.join(QUALITIES)}")
+        super().__init__(('127.0.0.1', port), FakeLLMHandler)
+        self.delay = delay
+        self.model = model
+        self.tokens_per_second = tokens_per_second
+        self.posts = posts
+        self.quality = quality
+        self.down = False
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def generation_seconds(self, tokens):
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fake ollama / openai-compatible server")
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds before each completion starts")
+    parser.add_argument('--tokens-per-second', type=float, help="generation speed (default: instant)")
+    parser.add_argument('--posts', type=int, default=1, help="posts in every canned answer")
+    parser.add_argument('--quality', choices=QUALITIES, default='clean', help="formatting of the canned posts")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.port, args.delay, tokens_per_second=args.tokens_per_second, posts=args.posts,
+                           quality=args.quality)
+    print(f"fake llm listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,58 @@
+import multiprocessing
 import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, KeepTogether
+from reportlab.platypus.doctemplate import Frame, NextPageTemplate, PageBegin, PageTemplate
+from reportlab.platypus.flowables import PageBreakIfNotEmpty
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from datetime import datetime
+from calendar_schema import CalendarData, parse_calendar_json
+
+
+DEFAULT_PILLARS = [
+    {"title": "Brand Awareness", "description": "Build brand recognition and visibility"},
+    {"title": "Engagement", "description": "Foster community interaction"},
+    {"title": "Education", "description": "Share valuable insights"},
+    {"title": "Promotion", "description": "Highlight products and services"}
+]
+
+DEFAULT_HASHTAGS = ['Marketing', 'SocialMedia', 'ContentCreation', 'DigitalMarketing', 'BrandAwareness',
+                    'Engagement', 'SocialMediaMarketing', 'ContentStrategy', 'OnlineMarketing', 'Business',
+                    'Entrepreneur', 'SmallBusiness', 'Branding', 'ContentMarketing', 'InboundMarketing']
+
+DEFAULT_SCHEDULE = [
+    {"platform": "Instagram", "frequency": "Daily", "best_times": "9 AM, 1 PM, 7 PM", "content_type": "Visual Stories"},
+    {"platform": "LinkedIn", "frequency": "5x/week", "best_times": "8 AM, 12 PM, 5 PM", "content_type": "Professional Insights"},
+    {"platform": "Twitter", "frequency": "Daily", "best_times": "9 AM, 3 PM, 8 PM", "content_type": "Quick Updates"},
+    {"platform": "Facebook", "frequency": "4x/week", "best_times": "10 AM, 1 PM, 6 PM", "content_type": "Community Content"},
+    {"platform": "TikTok", "frequency": "3x/week", "best_times": "6 PM, 8 PM, 10 PM", "content_type": "Trending Videos"}
+]
+
+DEFAULT_KPIS = [
+    {"metric": "Engagement Rate", "target": "5.2%"},
+    {"metric": "Follower Growth", "target": "+15%"},
+    {"metric": "Reach", "target": "50K+"},
+    {"metric": "Click-Through Rate", "target": "3.8%"},
+    {"metric": "Shares", "target": "500+"},
+    {"metric": "Comments", "target": "200+"},
+    {"metric": "Saves", "target": "300+"},
+    {"metric": "Video Views", "target": "25K+"}
+]
+
+
+PLATFORMS = ['instagram', 'linkedin', 'twitter', 'facebook', 'tiktok']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TIMES = ['9:00 AM', '12:00 PM', '3:00 PM', '6:00 PM', '7:00 PM']
+CONTENT_TYPES = ['Educational', 'Promotional', 'Entertaining', 'Inspirational', 'Behind-the-Scenes']
+
+MAX_POSTS = 35
+MIN_POSTS = 30
 
 
 def create_header_footer(canvas, doc):
@@ -20,8 +67,8 @@ def create_header_footer(canvas, doc):
     canvas.restoreState()
 
 
-def parse_text_output(text):
-    """Parse the text output from the AI agent"""
+def parse_text_output_regex(text):
+    """Original multi-pass regex parser, kept for comparison in benchmark.py"""
     data = {
         "brand_name": "Content Calendar",
         "month": datetime.now().strftime("%B %Y"),
@@ -51,20 +98,15 @@ def parse_text_output(text):
     
     # If no pillars found, add defaults
     if len(data["content_pillars"]) == 0:
-        data["content_pillars"] = [
-            {"title": "Brand Awareness", "description": "Build brand recognition and visibility"},
-            {"title": "Engagement", "description": "Foster community interaction"},
-            {"title": "Education", "description": "Share valuable insights"},
-            {"title": "Promotion", "description": "Highlight products and services"}
-        ]
+        data["content_pillars"] = [dict(pillar) for pillar in DEFAULT_PILLARS]
     
     # Extract posts - look for numbered posts
     post_sections = re.findall(r'(?:post|#)\s*(\d+)[:\-\s]+(.*?)(?=(?:post|#)\s*\d+|hashtag bank|posting schedule|kpi|$)', text, re.DOTALL | re.IGNORECASE)
     
-    platforms = ['instagram', 'linkedin', 'twitter', 'facebook', 'tiktok']
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    times = ['9:00 AM', '12:00 PM', '3:00 PM', '6:00 PM', '7:00 PM']
-    content_types = ['Educational', 'Promotional', 'Entertaining', 'Inspirational', 'Behind-the-Scenes']
+    platforms = PLATFORMS
+    days = DAYS
+    times = TIMES
+    content_types = CONTENT_TYPES
     
     for i, (num, content) in enumerate(post_sections[:35]):
         # Extract platform
@@ -98,7 +140,7 @@ def parse_text_output(text):
             "content_type": content_types[i % 5]
         })
     
-    # If we didn't find enough posts, create them
+    # last resort for copy that post_repair could not fix or never saw
     while len(data["posts"]) < 30:
         i = len(data["posts"])
         data["posts"].append({
@@ -118,110 +160,364 @@ def parse_text_output(text):
         data["hashtag_bank"] = re.findall(r'#?(\w+)', hashtag_section.group(1))[:30]
     
     if len(data["hashtag_bank"]) == 0:
-        data["hashtag_bank"] = ['Marketing', 'SocialMedia', 'ContentCreation', 'DigitalMarketing', 'BrandAwareness',
-                                 'Engagement', 'SocialMediaMarketing', 'ContentStrategy', 'OnlineMarketing', 'Business',
-                                 'Entrepreneur', 'SmallBusiness', 'Branding', 'ContentMarketing', 'InboundMarketing']
+        data["hashtag_bank"] = list(DEFAULT_HASHTAGS)
     
     # Posting schedule
-    data["posting_schedule"] = [
-        {"platform": "Instagram", "frequency": "Daily", "best_times": "9 AM, 1 PM, 7 PM", "content_type": "Visual Stories"},
-        {"platform": "LinkedIn", "frequency": "5x/week", "best_times": "8 AM, 12 PM, 5 PM", "content_type": "Professional Insights"},
-        {"platform": "Twitter", "frequency": "Daily", "best_times": "9 AM, 3 PM, 8 PM", "content_type": "Quick Updates"},
-        {"platform": "Facebook", "frequency": "4x/week", "best_times": "10 AM, 1 PM, 6 PM", "content_type": "Community Content"},
-        {"platform": "TikTok", "frequency": "3x/week", "best_times": "6 PM, 8 PM, 10 PM", "content_type": "Trending Videos"}
-    ]
+    data["posting_schedule"] = [dict(entry) for entry in DEFAULT_SCHEDULE]
     
     # KPI targets
-    data["kpi_targets"] = [
-        {"metric": "Engagement Rate", "target": "5.2%"},
-        {"metric": "Follower Growth", "target": "+15%"},
-        {"metric": "Reach", "target": "50K+"},
-        {"metric": "Click-Through Rate", "target": "3.8%"},
-        {"metric": "Shares", "target": "500+"},
-        {"metric": "Comments", "target": "200+"},
-        {"metric": "Saves", "target": "300+"},
-        {"metric": "Video Views", "target": "25K+"}
-    ]
+    data["kpi_targets"] = [dict(kpi) for kpi in DEFAULT_KPIS]
     
     data["stats"]["total_posts"] = len(data["posts"])
     
     return data
 
 
-def generate_pdf(result):
-    """Generate a professional PDF content calendar"""
-    
-    # Parse the text output
-    text = str(result.raw) if hasattr(result, 'raw') else str(result)
-    data = parse_text_output(text)
-    
-    output_path = "Content_Calendar.pdf"
-    
-    doc = SimpleDocTemplate(output_path, pagesize=letter,
-                           rightMargin=0.75*inch, leftMargin=0.75*inch,
-                           topMargin=1*inch, bottomMargin=1*inch)
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'],
-                                 fontSize=28, textColor=colors.HexColor('#667eea'),
-                                 spaceAfter=10, alignment=TA_CENTER, fontName='Helvetica-Bold')
-    
-    subtitle_style = ParagraphStyle('CustomSubtitle', parent=styles['Normal'],
-                                    fontSize=14, textColor=colors.HexColor('#764ba2'),
-                                    spaceAfter=30, alignment=TA_CENTER)
-    
-    section_header_style = ParagraphStyle('SectionHeader', parent=styles['Heading2'],
-                                         fontSize=18, textColor=colors.HexColor('#667eea'),
-                                         spaceAfter=15, spaceBefore=20, fontName='Helvetica-Bold')
-    
-    normal_style = ParagraphStyle('CustomNormal', parent=styles['Normal'],
-                                 fontSize=10, textColor=colors.HexColor('#4a5568'), spaceAfter=12)
-    
-    # Title
-    elements.append(Spacer(1, 1*inch))
-    elements.append(Paragraph(data['brand_name'], title_style))
-    elements.append(Paragraph(f"Content Calendar - {data['month']}", subtitle_style))
-    elements.append(Spacer(1, 0.5*inch))
-    
-    # Stats table
-    stats = data['stats']
-    stats_data = [
-        ['Total Posts', 'Platforms', 'Posts/Week', 'Content Themes'],
-        [str(stats['total_posts']), str(stats['platforms']), str(stats['posts_per_week']), str(stats['content_themes'])]
-    ]
-    
-    stats_table = Table(stats_data, colWidths=[1.5*inch]*4)
-    stats_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#667eea')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 12),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('TOPPADDING', (0,0), (-1,0), 12),
-        ('BACKGROUND', (0,1), (-1,-1), colors.HexColor('#f7fafc')),
-        ('TEXTCOLOR', (0,1), (-1,-1), colors.HexColor('#667eea')),
-        ('FONTNAME', (0,1), (-1,-1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,1), (-1,-1), 20),
-        ('TOPPADDING', (0,1), (-1,-1), 15),
-        ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#e2e8f0'))
-    ]))
-    
-    elements.append(stats_table)
-    elements.append(Spacer(1, 0.5*inch))
-    
-    # Content Pillars
-    if data['content_pillars']:
-        elements.append(Paragraph("Content Pillars", section_header_style))
-        pillar_data = [['Pillar', 'Description']]
-        for pillar in data['content_pillars']:
-            pillar_data.append([pillar['title'], pillar['description']])
-        
-        pillar_table = Table(pillar_data, colWidths=[2*inch, 4.5*inch])
-        pillar_table.setStyle(TableStyle([
+SECTION_HEADERS = [
+    ('pillars', re.compile(r'content pillars?\b')),
+    ('hashtags', re.compile(r'hashtag bank\b')),
+    ('schedule', re.compile(r'posting schedule\b')),
+    ('kpis', re.compile(r'kpi\b')),
+    ('posts', re.compile(r'(?:\d+\+?\s*)?(?:social media\s*)?posts?\s*:?$')),
+]
+
+# a post starts on a line that opens with "post 12", "post #12" or "#12:";
+# hashtags such as "#1" inside a line never start a post
+POST_START = re.compile(r'^[\s>*_-]*(?:post\s*#?\s*(\d+)\b|#\s*(\d+)\s*[:.)-])', re.IGNORECASE)
+FIELD = re.compile(r'^[\s>*_-]*(?:post\s+)?(title|content|caption|copy)\s*[:-]\s*(.*)', re.IGNORECASE)
+PILLAR = re.compile(r'^[\s>*_-]*(?:pillar|theme)\s*\d*\s*[:-]\s*(.+)', re.IGNORECASE)
+LABEL = re.compile(r'^[\s>*_-]*[a-z][a-z ]{1,24}:', re.IGNORECASE)
+HASHTAG = re.compile(r'#(\w*[a-zA-Z]\w*)')
+WORD = re.compile(r'#?(\w+)')
+
+
+def section_header(line):
+    """Name of the section a line opens, or None for ordinary lines"""
+    if len(line) > 60 or POST_START.match(line):
+        return None
+    heading = line.strip(' \t#*_=-:').lower()
+    for name, pattern in SECTION_HEADERS:
+        if pattern.match(heading):
+            return name
+    return None
+
+
+def build_post(index, number, lines, limit=300):
+    block = '\n'.join(lines)
+    lowered = block.lower()
+    platform = next((p for p in PLATFORMS if p in lowered), 'instagram')
+
+    title = None
+    content = []
+    in_content = False
+    for line in lines[1:]:
+        field = FIELD.match(line)
+        if field and field.group(1).lower() == 'title' and title is None:
+            title = field.group(2).strip()
+            in_content = False
+        elif field and not content:
+            content.append(field.group(2).strip())
+            in_content = True
+        elif in_content:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#') or stripped.lower().startswith('hashtag') or LABEL.match(line):
+                in_content = False
+            else:
+                content.append(line.strip())
+
+    post_content = ' '.join(c for c in content if c) if content else block[:200].strip()
+    hashtags = HASHTAG.findall(block) or ['BrandName', 'Marketing', 'SocialMedia', 'Content', 'Digital']
+
+    return {
+        "post_number": number,
+        "platform": platform,
+        "title": (title or f"Engaging {platform.title()} Post")[:80],
+        "content": post_content[:limit] if len(post_content) > 50 else f"{post_content} Join us in our journey to create amazing content that resonates with our community.",
+        "hashtags": hashtags[:8],
+        "posting_day": DAYS[index % 7],
+        "posting_time": TIMES[index % 5],
+        "content_type": CONTENT_TYPES[index % 5]
+    }
+
+
+def parse_text_output(text):
+    """Parse the text output from the AI agent in a single pass over its lines.
+
+    Every line is matched against a few anchored patterns at most once, so
+    parsing is linear in the size of the output.
+    """
+    data = {
+        "brand_name": "Content Calendar",
+        "month": datetime.now().strftime("%B %Y"),
+        "stats": {"total_posts": 30, "platforms": 5, "posts_per_week": 7, "content_themes": 4},
+        "content_pillars": [],
+        "posts": [],
+        "hashtag_bank": [],
+        "posting_schedule": [],
+        "kpi_targets": []
+    }
+
+    section = None
+    post_number = None
+    post_lines = []
+    hashtag_words = []
+    hashtag_tags = []
+
+    def finish_post():
+        if post_number is not None and len(data["posts"]) < MAX_POSTS:
+            data["posts"].append(build_post(len(data["posts"]), post_number, post_lines))
+
+    for line in text.splitlines():
+        header = section_header(line)
+        if header:
+            finish_post()
+            post_number, post_lines = None, []
+            section = header
+            continue
+
+        start = POST_START.match(line)
+        if start and section not in ('hashtags', 'schedule', 'kpis'):
+            finish_post()
+            post_number = int(start.group(1) or start.group(2))
+            post_lines = [line]
+            section = 'posts'
+            continue
+
+        if post_number is not None:
+            post_lines.append(line)
+        elif section == 'pillars':
+            pillar = PILLAR.match(line)
+            if pillar and len(data["content_pillars"]) < 6:
+                title = pillar.group(1).split('description')[0].strip()
+                data["content_pillars"].append({
+                    "title": title,
+                    "description": f"Strategic content focused on {title.lower()}"
+                })
+        elif section == 'hashtags':
+            if len(hashtag_tags) < 30:
+                hashtag_tags.extend(HASHTAG.findall(line))
+            if len(hashtag_words) < 30:
+                hashtag_words.extend(WORD.findall(line))
+        elif data["brand_name"] == "Content Calendar" and line.strip().lower().startswith('brand name'):
+            name = line.strip()[len('brand name'):].lstrip(' :').strip()
+            if name:
+                data["brand_name"] = name
+
+    finish_post()
+
+    if len(data["content_pillars"]) == 0:
+        data["content_pillars"] = [dict(pillar) for pillar in DEFAULT_PILLARS]
+
+    # last resort for copy that post_repair could not fix or never saw
+    while len(data["posts"]) < MIN_POSTS:
+        i = len(data["posts"])
+        data["posts"].append({
+            "post_number": i + 1,
+            "platform": PLATFORMS[i % 5],
+            "title": f"Engaging {PLATFORMS[i % 5].title()} Content",
+            "content": f"Share valuable insights and connect with your audience through authentic storytelling. This post is designed to engage your followers and build lasting relationships with your community members.",
+            "hashtags": ['Marketing', 'SocialMedia', 'Content', 'Digital', 'Brand'],
+            "posting_day": DAYS[i % 7],
+            "posting_time": TIMES[i % 5],
+            "content_type": CONTENT_TYPES[i % 5]
+        })
+
+    data["hashtag_bank"] = (hashtag_tags or hashtag_words)[:30] or list(DEFAULT_HASHTAGS)
+    data["posting_schedule"] = [dict(entry) for entry in DEFAULT_SCHEDULE]
+    data["kpi_targets"] = [dict(kpi) for kpi in DEFAULT_KPIS]
+    data["stats"]["total_posts"] = len(data["posts"])
+
+    return data
+
+
+def structured_data(calendar):
+    """Turn a validated CalendarData into the data dict generate_pdf renders"""
+    data = calendar.model_dump()
+    data["month"] = data["month"] or datetime.now().strftime("%B %Y")
+    data["content_pillars"] = data["content_pillars"] or [dict(pillar) for pillar in DEFAULT_PILLARS]
+    data["hashtag_bank"] = data["hashtag_bank"] or list(DEFAULT_HASHTAGS)
+    data["posting_schedule"] = data["posting_schedule"] or [dict(entry) for entry in DEFAULT_SCHEDULE]
+    data["kpi_targets"] = data["kpi_targets"] or [dict(kpi) for kpi in DEFAULT_KPIS]
+
+    stats = data["stats"]
+    stats["total_posts"] = len(data["posts"])
+    stats["platforms"] = stats["platforms"] or len({post["platform"] for post in data["posts"]})
+    stats["posts_per_week"] = stats["posts_per_week"] or max(1, round(len(data["posts"]) / 4))
+    stats["content_themes"] = stats["content_themes"] or len(data["content_pillars"])
+    return data
+
+
+def calendar_data(result):
+    """Structured calendar from the packager if it produced one, else the text parser"""
+    calendar = getattr(result, 'pydantic', None)
+    text = result_text(result)
+    if not isinstance(calendar, CalendarData):
+        calendar = parse_calendar_json(text)
+    if calendar is not None and calendar.posts:
+        return structured_data(calendar)
+    return parse_text_output(text)
+
+
+def merge_month_calendars(months, texts, horizon):
+    """Merge one calendar per month into a single calendar spanning them.
+
+    Posts keep their order, are numbered across the whole horizon and carry
+    their month label; horizon labels the merged calendar. Returns the
+    merged calendar as CalendarData JSON.
+    """
+    merged, posts, pillars, hashtags = None, [], {}, []
+    for month, text in zip(months, texts):
+        data = calendar_data(text)
+        merged = merged or data
+        for post in data["posts"]:
+            posts.append({**post, "post_number": len(posts) + 1, "month": month})
+        for pillar in data["content_pillars"]:
+            pillars.setdefault(pillar["title"].lower(), pillar)
+        hashtags.extend(tag for tag in data["hashtag_bank"] if tag not in hashtags)
+
+    merged.update(
+        month=horizon,
+        posts=posts,
+        content_pillars=list(pillars.values()),
+        hashtag_bank=hashtags[:30],
+        stats={
+            "total_posts": len(posts),
+            "platforms": len({post["platform"] for post in posts}),
+            "posts_per_week": max(1, round(len(posts) * 12 / (52 * len(months)))),
+            "content_themes": len(pillars),
+        },
+    )
+    return CalendarData.model_validate(merged).model_dump_json()
+
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate that lays flowables out as an iterable yields them.
+
+    build() needs the whole flowable list up front; build_stream() pulls one
+    flowable at a time and lets it go once it is drawn on a finished page.
+    The canvas still keeps every finished page until save, so memory grows
+    with the page count, by about the size of the PDF.
+    """
+
+    def build_stream(self, flowables, onFirstPage, onLaterPages):
+        """BaseDocTemplate.build over an iterable, step for step: the same
+        document info restore, PageBreakIfNotEmpty and hanging-flowable
+        handling, error trace info and progress callbacks, with no size
+        estimate as the count is unknown"""
+        self._calc()
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='First', frames=frame, onPage=onFirstPage, pagesize=self.pagesize),
+                               PageTemplate(id='Later', frames=frame, onPage=onLaterPages, pagesize=self.pagesize)])
+        if self._onProgress:
+            self._onProgress('STARTED', 0)
+        self._startBuild()
+
+        # embedded PDFs can bring their own info dictionary; ours is put back after the build
+        canv = self.canv
+        self._savedInfo = canv._doc.info
+        flowables = iter(flowables)
+        pending = []
+        handled = 0
+        try:
+            canv._doctemplate = self
+            while True:
+                # handle_flowable pops from the front of the list and pushes
+                # back split remainders; it also groups a keepWithNext chain
+                # with the flowable after it, so that one is pulled in too
+                while not pending or pending[-1].getKeepWithNext():
+                    flowable = next(flowables, None)
+                    if flowable is None:
+                        break
+                    pending.append(flowable)
+                if not pending:
+                    break
+
+                if self._hanging and self._hanging[-1] is PageBegin and isinstance(pending[0], PageBreakIfNotEmpty):
+                    npt = pending[0].nextTemplate
+                    if npt and not self._samePT(npt):
+                        NextPageTemplate(npt).apply(self)
+                        self._setPageTemplate()
+                    del pending[0]
+                    if not pending:
+                        continue
+                self.clean_hanging()
+                first = pending[0]
+                try:
+                    self.handle_flowable(pending)
+                except Exception as e:
+                    trace = getattr(first, '_traceInfo', None)
+                    if trace and e.args:
+                        e.args = (f"{e.args[0]}\n(srcFile {trace.srcFile}, line {trace.startLineNo} char "
+                                  f"{trace.startLinePos} to line {trace.endLineNo} char {trace.endLinePos})",
+                                  *e.args[1:])
+                    raise
+                handled += 1
+                if self._onProgress:
+                    self._onProgress('PROGRESS', handled)
+        finally:
+            del canv._doctemplate
+
+        canv._doc.info = self._savedInfo
+        self._endBuild()
+        if self._onProgress:
+            self._onProgress('FINISHED', 0)
+
+
+PLATFORM_COLORS = {
+    'linkedin': '#0077b5',
+    'twitter': '#1da1f2',
+    'instagram': '#e4405f',
+    'facebook': '#1877f2',
+    'tiktok': '#000000'
+}
+
+
+class CalendarRenderer:
+    """Renders calendar data dicts to PDF.
+
+    Paragraph styles, platform colors and table styles are built once per
+    renderer and shared by every document it renders.
+    """
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+
+        self.title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'],
+                                          fontSize=28, textColor=colors.HexColor('#667eea'),
+                                          spaceAfter=10, alignment=TA_CENTER, fontName='Helvetica-Bold')
+
+        self.subtitle_style = ParagraphStyle('CustomSubtitle', parent=styles['Normal'],
+                                             fontSize=14, textColor=colors.HexColor('#764ba2'),
+                                             spaceAfter=30, alignment=TA_CENTER)
+
+        self.section_header_style = ParagraphStyle('SectionHeader', parent=styles['Heading2'],
+                                                   fontSize=18, textColor=colors.HexColor('#667eea'),
+                                                   spaceAfter=15, spaceBefore=20, fontName='Helvetica-Bold')
+
+        self.month_header_style = ParagraphStyle('MonthHeader', parent=styles['Heading3'],
+                                                 fontSize=14, textColor=colors.HexColor('#764ba2'),
+                                                 spaceAfter=10, fontName='Helvetica-Bold')
+
+        self.normal_style = ParagraphStyle('CustomNormal', parent=styles['Normal'],
+                                           fontSize=10, textColor=colors.HexColor('#4a5568'), spaceAfter=12)
+
+        self.stats_table_style = TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#667eea')),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,0), 12),
+            ('BOTTOMPADDING', (0,0), (-1,0), 12),
+            ('TOPPADDING', (0,0), (-1,0), 12),
+            ('BACKGROUND', (0,1), (-1,-1), colors.HexColor('#f7fafc')),
+            ('TEXTCOLOR', (0,1), (-1,-1), colors.HexColor('#667eea')),
+            ('FONTNAME', (0,1), (-1,-1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,1), (-1,-1), 20),
+            ('TOPPADDING', (0,1), (-1,-1), 15),
+            ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#e2e8f0'))
+        ])
+
+        self.pillar_table_style = TableStyle([
             ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#764ba2')),
             ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
             ('ALIGN', (0,0), (-1,-1), 'LEFT'),
@@ -233,76 +529,16 @@ def generate_pdf(result):
             ('VALIGN', (0,0), (-1,-1), 'TOP'),
             ('TOPPADDING', (0,1), (-1,-1), 8),
             ('BOTTOMPADDING', (0,1), (-1,-1), 8)
-        ]))
-        elements.append(pillar_table)
-    
-    elements.append(PageBreak())
-    
-    # Posts
-    platform_colors = {
-        'linkedin': colors.HexColor('#0077b5'),
-        'twitter': colors.HexColor('#1da1f2'),
-        'instagram': colors.HexColor('#e4405f'),
-        'facebook': colors.HexColor('#1877f2'),
-        'tiktok': colors.HexColor('#000000')
-    }
-    
-    elements.append(Paragraph(f"Content Library ({len(data['posts'])} Posts)", section_header_style))
-    
-    for i, post in enumerate(data['posts']):
-        platform_color = platform_colors.get(post['platform'], colors.HexColor('#667eea'))
-        
-        post_header = [[f"Post #{post['post_number']}", post['platform'].upper(), 
-                       post['posting_day'], post['posting_time']]]
-        
-        header_table = Table(post_header, colWidths=[1.5*inch]*4)
-        header_table.setStyle(TableStyle([
-            ('BACKGROUND', (1,0), (1,0), platform_color),
-            ('TEXTCOLOR', (1,0), (1,0), colors.whitesmoke),
-            ('BACKGROUND', (0,0), (0,0), colors.HexColor('#f7fafc')),
-            ('BACKGROUND', (2,0), (-1,0), colors.HexColor('#f7fafc')),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,-1), 9),
-            ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#e2e8f0')),
-            ('TOPPADDING', (0,0), (-1,-1), 6),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 6)
-        ]))
-        
-        post_elements = [header_table, Spacer(1, 0.08*inch)]
-        post_elements.append(Paragraph(f"<b>{post['title']}</b>", normal_style))
-        post_elements.append(Paragraph(post['content'], normal_style))
-        
-        if post['hashtags']:
-            hashtags = ' '.join([f'#{h}' for h in post['hashtags']])
-            post_elements.append(Paragraph(f'<font color="#667eea"><b>{hashtags}</b></font>', normal_style))
-        
-        post_elements.append(Paragraph(f'<font color="#11998e"><b>Type: {post["content_type"]}</b></font>', normal_style))
-        post_elements.append(Spacer(1, 0.15*inch))
-        
-        elements.append(KeepTogether(post_elements))
-        
-        if (i + 1) % 3 == 0 and i < len(data['posts']) - 1:
-            elements.append(PageBreak())
-    
-    elements.append(PageBreak())
-    
-    if data['hashtag_bank']:
-        elements.append(Paragraph("Hashtag Bank", section_header_style))
-        hashtag_rows = []
-        row = []
-        for i, tag in enumerate(data['hashtag_bank'][:25]):
-            row.append(f'#{tag}')
-            if (i + 1) % 5 == 0:
-                hashtag_rows.append(row)
-                row = []
-        if row:
-            while len(row) < 5:
-                row.append('')
-            hashtag_rows.append(row)
-        
-        hashtag_table = Table(hashtag_rows, colWidths=[1.3*inch]*5)
-        hashtag_table.setStyle(TableStyle([
+        ])
+
+        # one post header style per platform, plus the brand color for unknown ones
+        self.post_header_styles = {
+            platform: self.post_header_style(colors.HexColor(color))
+            for platform, color in PLATFORM_COLORS.items()
+        }
+        self.default_post_header_style = self.post_header_style(colors.HexColor('#667eea'))
+
+        self.hashtag_table_style = TableStyle([
             ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#667eea')),
             ('TEXTCOLOR', (0,0), (-1,-1), colors.whitesmoke),
             ('ALIGN', (0,0), (-1,-1), 'CENTER'),
@@ -310,20 +546,9 @@ def generate_pdf(result):
             ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#764ba2')),
             ('TOPPADDING', (0,0), (-1,-1), 8),
             ('BOTTOMPADDING', (0,0), (-1,-1), 8)
-        ]))
-        elements.append(hashtag_table)
-    
+        ])
 
-    if data['posting_schedule']:
-        elements.append(Spacer(1, 0.3*inch))
-        elements.append(Paragraph("Posting Schedule", section_header_style))
-        schedule_data = [['Platform', 'Frequency', 'Best Times', 'Content Type']]
-        for item in data['posting_schedule']:
-            schedule_data.append([item['platform'], item['frequency'], 
-                                 item['best_times'], item['content_type']])
-        
-        schedule_table = Table(schedule_data, colWidths=[1.5*inch, 1.5*inch, 1.8*inch, 1.7*inch])
-        schedule_table.setStyle(TableStyle([
+        self.schedule_table_style = TableStyle([
             ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#11998e')),
             ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
             ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
@@ -332,18 +557,9 @@ def generate_pdf(result):
             ('ALIGN', (0,0), (-1,-1), 'CENTER'),
             ('TOPPADDING', (0,0), (-1,-1), 8),
             ('BOTTOMPADDING', (0,0), (-1,-1), 8)
-        ]))
-        elements.append(schedule_table)
-    
-    if data['kpi_targets']:
-        elements.append(Spacer(1, 0.3*inch))
-        elements.append(Paragraph("KPI Targets", section_header_style))
-        kpi_data = [['Metric', 'Target']]
-        for kpi in data['kpi_targets']:
-            kpi_data.append([kpi['metric'], kpi['target']])
-        
-        kpi_table = Table(kpi_data, colWidths=[3.5*inch, 3*inch])
-        kpi_table.setStyle(TableStyle([
+        ])
+
+        self.kpi_table_style = TableStyle([
             ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#38ef7d')),
             ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor('#1a202c')),
             ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
@@ -355,8 +571,203 @@ def generate_pdf(result):
             ('ALIGN', (0,0), (-1,-1), 'CENTER'),
             ('TOPPADDING', (0,0), (-1,-1), 10),
             ('BOTTOMPADDING', (0,0), (-1,-1), 10)
-        ]))
-        elements.append(kpi_table)
-    
-    doc.build(elements, onFirstPage=create_header_footer, onLaterPages=create_header_footer)
-    return output_path
\ No newline at end of file
+        ])
+
+    def post_header_style(self, platform_color):
+        return TableStyle([
+            ('BACKGROUND', (1,0), (1,0), platform_color),
+            ('TEXTCOLOR', (1,0), (1,0), colors.whitesmoke),
+            ('BACKGROUND', (0,0), (0,0), colors.HexColor('#f7fafc')),
+            ('BACKGROUND', (2,0), (-1,0), colors.HexColor('#f7fafc')),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,-1), 9),
+            ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#e2e8f0')),
+            ('TOPPADDING', (0,0), (-1,-1), 6),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 6)
+        ])
+
+    def render(self, data, output):
+        """Render to output, a file path or a writable binary stream.
+
+        data['posts'] may be any iterable, including a generator; flowables
+        are laid out as they are produced, so they are never all held at once.
+        The finished pages are, until the PDF is saved (see
+        StreamingDocTemplate).
+        """
+        doc = StreamingDocTemplate(output, pagesize=letter,
+                                   rightMargin=0.75*inch, leftMargin=0.75*inch,
+                                   topMargin=1*inch, bottomMargin=1*inch)
+        doc.build_stream(self.flowables(data), onFirstPage=create_header_footer, onLaterPages=create_header_footer)
+        return output
+
+    def flowables(self, data):
+        """Yield the document's flowables in order"""
+        # Title
+        yield Spacer(1, 1*inch)
+        yield Paragraph(data['brand_name'], self.title_style)
+        yield Paragraph(f"Content Calendar - {data['month']}", self.subtitle_style)
+        yield Spacer(1, 0.5*inch)
+
+        # Stats table
+        stats = data['stats']
+        stats_data = [
+            ['Total Posts', 'Platforms', 'Posts/Week', 'Content Themes'],
+            [str(stats['total_posts']), str(stats['platforms']), str(stats['posts_per_week']), str(stats['content_themes'])]
+        ]
+
+        stats_table = Table(stats_data, colWidths=[1.5*inch]*4)
+        stats_table.setStyle(self.stats_table_style)
+
+        yield stats_table
+        yield Spacer(1, 0.5*inch)
+
+        # Content Pillars
+        if data['content_pillars']:
+            yield Paragraph("Content Pillars", self.section_header_style)
+            pillar_data = [['Pillar', 'Description']]
+            for pillar in data['content_pillars']:
+                pillar_data.append([pillar['title'], pillar['description']])
+
+            pillar_table = Table(pillar_data, colWidths=[2*inch, 4.5*inch])
+            pillar_table.setStyle(self.pillar_table_style)
+            yield pillar_table
+
+        yield PageBreak()
+
+        # Posts
+        yield Paragraph(f"Content Library ({data['stats']['total_posts']} Posts)", self.section_header_style)
+
+        # three posts a page; multi-month calendars start each month on a new
+        # page under its label
+        month, on_page = None, 0
+        for post in data['posts']:
+            if post.get('month') and post['month'] != month:
+                month = post['month']
+                if on_page:
+                    yield PageBreak()
+                yield Paragraph(month, self.month_header_style)
+                on_page = 0
+            elif on_page == 3:
+                yield PageBreak()
+                on_page = 0
+            yield KeepTogether(self.post_flowables(post))
+            on_page += 1
+
+        yield PageBreak()
+
+        if data['hashtag_bank']:
+            yield Paragraph("Hashtag Bank", self.section_header_style)
+            hashtag_rows = []
+            row = []
+            for i, tag in enumerate(data['hashtag_bank'][:25]):
+                row.append(f'#{tag}')
+                if (i + 1) % 5 == 0:
+                    hashtag_rows.append(row)
+                    row = []
+            if row:
+                while len(row) < 5:
+                    row.append('')
+                hashtag_rows.append(row)
+
+            hashtag_table = Table(hashtag_rows, colWidths=[1.3*inch]*5)
+            hashtag_table.setStyle(self.hashtag_table_style)
+            yield hashtag_table
+
+        if data['posting_schedule']:
+            yield Spacer(1, 0.3*inch)
+            yield Paragraph("Posting Schedule", self.section_header_style)
+            schedule_data = [['Platform', 'Frequency', 'Best Times', 'Content Type']]
+            for item in data['posting_schedule']:
+                schedule_data.append([item['platform'], item['frequency'],
+                                     item['best_times'], item['content_type']])
+
+            schedule_table = Table(schedule_data, colWidths=[1.5*inch, 1.5*inch, 1.8*inch, 1.7*inch])
+            schedule_table.setStyle(self.schedule_table_style)
+            yield schedule_table
+
+        if data['kpi_targets']:
+            yield Spacer(1, 0.3*inch)
+            yield Paragraph("KPI Targets", self.section_header_style)
+            kpi_data = [['Metric', 'Target']]
+            for kpi in data['kpi_targets']:
+                kpi_data.append([kpi['metric'], kpi['target']])
+
+            kpi_table = Table(kpi_data, colWidths=[3.5*inch, 3*inch])
+            kpi_table.setStyle(self.kpi_table_style)
+            yield kpi_table
+
+
+    def post_flowables(self, post):
+        post_header = [[f"Post #{post['post_number']}", post['platform'].upper(),
+                       post['posting_day'], post['posting_time']]]
+
+        header_table = Table(post_header, colWidths=[1.5*inch]*4)
+        header_table.setStyle(self.post_header_styles.get(post['platform'], self.default_post_header_style))
+
+        post_elements = [header_table, Spacer(1, 0.08*inch)]
+        post_elements.append(Paragraph(f"<b>{post['title']}</b>", self.normal_style))
+        post_elements.append(Paragraph(post['content'], self.normal_style))
+
+        if post['hashtags']:
+            hashtags = ' '.join([f'#{h}' for h in post['hashtags']])
+            post_elements.append(Paragraph(f'<font color="#667eea"><b>{hashtags}</b></font>', self.normal_style))
+
+        post_elements.append(Paragraph(f'<font color="#11998e"><b>Type: {post["content_type"]}</b></font>', self.normal_style))
+        post_elements.append(Spacer(1, 0.15*inch))
+        return post_elements
+
+
+_default_renderer = None
+
+
+def default_renderer():
+    """Renderer shared by every render in this process, created on first use"""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = CalendarRenderer()
+    return _default_renderer
+
+
+def result_text(result):
+    return str(result.raw) if hasattr(result, 'raw') else str(result)
+
+
+def generate_pdf(result, output=None):
+    """Generate a professional PDF content calendar.
+
+    With no output the PDF is rendered in memory and its bytes are returned.
+    output may also be a file path or a writable binary stream, which is
+    written to and returned.
+    """
+    if output is not None:
+        return default_renderer().render(calendar_data(result), output)
+
+    buffer = BytesIO()
+    default_renderer().render(calendar_data(result), buffer)
+    return buffer.getvalue()
+
+
+def spool_pdf(result, directory=None):
+    """Render to a new uniquely named temp file and return its path.
+
+    Saves the caller from holding the finished PDF as bytes; rendering still
+    keeps the whole document in memory until it is saved (see
+    StreamingDocTemplate). The caller owns the file.
+    """
+    with tempfile.NamedTemporaryFile(prefix='content_calendar_', suffix='.pdf',
+                                     dir=directory, delete=False) as f:
+        default_renderer().render(calendar_data(result), f)
+    return f.name
+
+
+def render_many(results, output_paths, processes=None):
+    """Render many calendars across a process pool; returns the output paths.
+
+    Results are sent to the workers as raw text, which carries the packager's
+    JSON when it produced structured output. Each worker process builds its
+    renderer once and reuses it for every calendar it renders.
+    """
+    texts = [result_text(result) for result in results]
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(generate_pdf, texts, output_paths))
@@ -0,0 +1,42 @@
+from datetime import date
+
+
+def first_of_month(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def horizon_months(months=1, start=None, end=None):
+    """First day of every month in the planning horizon.
+
+    The horizon is either `months` months from `start` or, when `end` is
+    given, every month from `start` to `end` inclusive. start defaults to
+    the current month; dates may be date objects or ISO strings.
+    """
+    start = first_of_month(date.fromisoformat(start) if isinstance(start, str) else start or date.today())
+    if end is not None:
+        end = first_of_month(date.fromisoformat(end) if isinstance(end, str) else end)
+        if end < start:
+            raise ValueError(f"horizon end {end} is before its start {start}")
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+    if months < 1:
+        raise ValueError("the horizon needs at least one month")
+    return [add_months(start, i) for i in range(months)]
+
+
+def month_label(month):
+    return month.strftime("%B %Y")
+
+
+def month_key(month):
+    """Month as used in graph step names, e.g. 2025_03"""
+    return month.strftime("%Y_%m")
+
+
+def horizon_label(months):
+    labels = [month_label(month) for month in months]
+    return labels[0] if len(labels) == 1 else f"{labels[0]} - {labels[-1]}"
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crewai.events import LLMCallCompletedEvent, LLMCallFailedEvent, LLMCallStartedEvent, crewai_event_bus
+
+from scheduler import emit
+
+# crewai reports llm calls on its event bus, in a copy of the calling
+# context, so the handlers can pass them on to the run's listener tagged
+# with the stage that made them
+
+
+@crewai_event_bus.on(LLMCallStartedEvent)
+def forward_call_started(source, event):
+    emit("llm_started", call_id=event.call_id, at=event.timestamp.timestamp())
+
+
+@crewai_event_bus.on(LLMCallCompletedEvent)
+def forward_call_completed(source, event):
+    usage = event.usage or {}
+    emit("llm_call", call_id=event.call_id, agent=event.agent_role, at=event.timestamp.timestamp(),
+         prompt_tokens=usage.get('prompt_tokens', 0), completion_tokens=usage.get('completion_tokens', 0))
+
+
+@crewai_event_bus.on(LLMCallFailedEvent)
+def forward_call_failed(source, event):
+    emit("llm_failed", call_id=event.call_id, agent=event.agent_role, at=event.timestamp.timestamp())
+
+
+def new_stats():
+    return {"llm_calls": 0, "failures": 0, "stopped_early": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "llm_seconds": 0.0}
+
+
+def with_rates(stats):
+    seconds = stats["llm_seconds"]
+    return {**stats, "llm_seconds": round(seconds, 3),
+            "tokens_per_second": round(stats["completion_tokens"] / seconds, 1) if seconds else None}
+
+
+class RunRecorder:
+    """Listener that turns a run's progress events into a run report.
+
+    Pass record() as the listener of a graph run (or alongside another
+    listener) and call report() once the run is over.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.agents = defaultdict(new_stats)
+        self.calls = {}
+
+    def stage(self, name):
+        return self.stages.setdefault(name, {"wall_seconds": None, "queue_seconds": None, "reused": False,
+                                             "agent": None, **new_stats()})
+
+    def record(self, event):
+        kind, name = event["type"], event["stage"] or "crew"
+        with self._lock:
+            if kind == "stage_started":
+                self.stage(name)["queue_seconds"] = round(event.get("queued", 0.0), 3)
+            elif kind == "stage_finished":
+                self.stage(name).update(wall_seconds=round(event["seconds"], 3), reused=event["reused"])
+            elif kind == "context_compacted":
+                self.stage(name)["context_tokens"] = {"before": event["before"], "after": event["after"]}
+            elif kind == "posts_repaired":
+                self.stage(name).update(missing_posts=event["missing"], malformed_posts=event["malformed"],
+                                        repaired_posts=event["repaired"])
+            elif kind == "llm_started":
+                self.calls[event["call_id"]] = event["at"]
+            elif kind in ("llm_call", "llm_failed", "llm_stopped"):
+                stage = self.stage(name)
+                stage["agent"] = stage["agent"] or event["agent"]
+                if kind == "llm_stopped":
+                    # ended by its output limit; crewai reports no usage, so tokens are estimated
+                    seconds = event["seconds"]
+                else:
+                    seconds = event["at"] - self.calls.pop(event["call_id"], event["at"])
+                for stats in (stage, self.agents[event["agent"] or "unknown"]):
+                    stats["llm_calls"] += 1
+                    stats["llm_seconds"] += seconds
+                    if kind == "llm_failed":
+                        stats["failures"] += 1
+                        continue
+                    if kind == "llm_stopped":
+                        stats["stopped_early"] += 1
+                    stats["prompt_tokens"] += event.get("prompt_tokens", 0)
+                    stats["completion_tokens"] += event["completion_tokens"]
+
+    def report(self):
+        """Structured run report: per stage, per agent and totals"""
+        with self._lock:
+            totals = new_stats()
+            for stats in self.agents.values():
+                for key in totals:
+                    totals[key] += stats[key]
+            return {
+                "wall_seconds": round(time.perf_counter() - self.started, 3),
+                "stages": {name: with_rates(stats) for name, stats in self.stages.items()},
+                "agents": {role: with_rates(stats) for role, stats in self.agents.items()},
+                "totals": with_rates(totals),
+            }
+
+
+METRICS = [
+    ("wall_seconds", "seconds from a stage starting to finishing"),
+    ("queue_seconds", "seconds a ready stage waited for a worker"),
+    ("llm_calls", "llm calls made by the stage"),
+    ("failures", "llm calls that failed"),
+    ("stopped_early", "llm calls ended once the stage had the output it needs"),
+    ("repaired_posts", "missing or malformed posts the stage wrote again"),
+    ("prompt_tokens", "prompt tokens sent by the stage"),
+    ("completion_tokens", "completion tokens generated for the stage"),
+    ("tokens_per_second", "completion tokens per second of llm time"),
+]
+
+
+def prometheus_text(report):
+    """Run report in the Prometheus text exposition format"""
+    lines = [
+        "# HELP content_calendar_run_seconds wall time of the last run",
+        "# TYPE content_calendar_run_seconds gauge",
+        f"content_calendar_run_seconds {report['wall_seconds']}",
+    ]
+    for key, description in METRICS:
+        metric = f"content_calendar_stage_{key}"
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} gauge"]
+        for stage, stats in report["stages"].items():
+            if stats.get(key) is not None:
+                lines.append(f'{metric}{{stage="{stage}",agent="{stats["agent"] or ""}"}} {stats[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+def start_metrics_server(port, latest_report, host='127.0.0.1'):
+    """Serve prometheus_text(latest_report()) at host:port/metrics from a
+    daemon thread; local only unless another host is given"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            report = latest_report() if self.path.rstrip('/') == '/metrics' else None
+            body = prometheus_text(report).encode('utf-8') if report else b''
+            self.send_response(200 if report else 404)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,280 @@
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+from scheduler import fingerprint
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# seconds between a worker's heartbeats, and without one before its job is
+# given to another worker
+HEARTBEAT_INTERVAL = 10.0
+STALE_AFTER = 60.0
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_exited(worker):
+    """Whether the worker process is known to be gone: it ran on this host
+    and no process has its pid"""
+    host, _, pid = (worker or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+class JobQueue:
+    """SQLite-backed queue of calendar generations shared by app and workers"""
+
+    def __init__(self, path=".jobs.sqlite"):
+        self.path = path
+        with self._db() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    brand_input TEXT NOT NULL,
+                    options TEXT NOT NULL DEFAULT '{}',
+                    key TEXT,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    worker TEXT,
+                    heartbeat REAL
+                )
+            """)
+            columns = [row[1] for row in db.execute("PRAGMA table_info(jobs)")]
+            if 'options' not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN options TEXT NOT NULL DEFAULT '{}'")
+            if 'key' not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN key TEXT")
+            if 'worker' not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+                db.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status)")
+
+    def _db(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def submit(self, brand_input, options=None):
+        """Queue a generation; options are passed to the worker's ContentCalendarCrew.
+
+        A submission identical to a job still queued or running gets that
+        job's id instead of a new job, so both callers follow one run.
+        """
+        key = fingerprint(brand_input, options or {})
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT id FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY created LIMIT 1",
+                (key, QUEUED, RUNNING)
+            ).fetchone()
+            job_id = row[0] if row else uuid.uuid4().hex
+            if row is None:
+                db.execute(
+                    "INSERT INTO jobs (id, status, brand_input, options, key, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, json.dumps(brand_input), json.dumps(options or {}), key, time.time())
+                )
+            db.execute("COMMIT")
+        return job_id
+
+    def claim(self, worker=None):
+        """Mark the oldest queued job as running by worker and return (id, brand_input, options)"""
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT id, brand_input, options FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row:
+                now = time.time()
+                db.execute("UPDATE jobs SET status = ?, started = ?, worker = ?, heartbeat = ? WHERE id = ?",
+                           (RUNNING, now, worker, now, row[0]))
+            db.execute("COMMIT")
+        return (row[0], json.loads(row[1]), json.loads(row[2])) if row else None
+
+    def heartbeat(self, job_id):
+        with self._db() as db:
+            db.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = ?", (time.time(), job_id, RUNNING))
+
+    def update_progress(self, job_id, progress):
+        with self._db() as db:
+            db.execute("UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id))
+
+    def finish(self, job_id, result, progress):
+        with self._db() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, progress = ?, finished = ? WHERE id = ?",
+                (DONE, result, json.dumps(progress), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        with self._db() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id)
+            )
+
+    def requeue_orphaned(self, stale_after=STALE_AFTER):
+        """Put jobs whose worker is gone back in the queue: it has not sent a
+        heartbeat for stale_after seconds, or its process on this host has
+        exited. Jobs of live workers, of this server or another, are left."""
+        cutoff = time.time() - stale_after
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            orphaned = [
+                job_id for job_id, worker, heartbeat in db.execute(
+                    "SELECT id, worker, heartbeat FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+                if (heartbeat or 0) < cutoff or worker_exited(worker)
+            ]
+            db.executemany(
+                "UPDATE jobs SET status = ?, started = NULL, worker = NULL, heartbeat = NULL WHERE id = ?",
+                [(QUEUED, job_id) for job_id in orphaned]
+            )
+            db.execute("COMMIT")
+        return orphaned
+
+    def get(self, job_id):
+        with self._db() as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['brand_input'] = json.loads(job['brand_input'])
+        job['options'] = json.loads(job['options'])
+        job['progress'] = json.loads(job['progress'])
+        job['position'] = self.position(job) if job['status'] == QUEUED else 0
+        return job
+
+    def latest_report(self):
+        """Run report of the most recently finished job, if any"""
+        with self._db() as db:
+            row = db.execute(
+                "SELECT progress FROM jobs WHERE status = ? ORDER BY finished DESC LIMIT 1", (DONE,)
+            ).fetchone()
+        return json.loads(row[0]).get('report') if row else None
+
+    def position(self, job):
+        with self._db() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created < ?", (QUEUED, job['created'])
+            ).fetchone()[0] + 1
+
+
+def run_job(queue, job_id, brand_input, crew):
+    from model_config import response_cache
+
+    # progress keeps the state and timing of every stage plus the tail of the
+    # text being written, flushed at most once a second while tokens stream
+    progress = {"stages": {}}
+    last_flush = 0.0
+    # the worker's cache counters add up across jobs; this job reports its own
+    cache_before = response_cache.stats()
+    result = None
+
+    for event in crew.stream(brand_input):
+        stage = event["stage"]
+        if event["type"] == "stage_started":
+            progress["stages"][stage] = {"state": RUNNING, "tail": ""}
+        elif event["type"] == "context_compacted":
+            progress["stages"][stage]["context"] = {"before": event["before"], "after": event["after"]}
+        elif event["type"] == "token":
+            entry = progress["stages"][stage]
+            entry["tail"] = (entry["tail"] + event["text"])[-600:]
+            if time.time() - last_flush < 1.0:
+                continue
+        elif event["type"] == "stage_finished":
+            progress["stages"][stage] = {"state": DONE, "seconds": round(event["seconds"], 2),
+                                         "reused": event["reused"],
+                                         "context": progress["stages"][stage].get("context")}
+        elif event["type"] == "result":
+            result = event["result"]
+            continue
+        else:
+            continue
+        queue.update_progress(job_id, progress)
+        last_flush = time.time()
+
+    progress["reused"] = getattr(result, 'reused', [])
+    progress["recalled"] = getattr(result, 'recalled', {})
+    progress["context_tokens"] = getattr(result, 'context_tokens', {})
+    progress["cache"] = response_cache.stats(since=cache_before)
+    progress["report"] = result.report
+    queue.finish(job_id, result.raw, progress)
+
+
+def worker(path, poll_interval=1.0):
+    """Worker process loop: claim queued jobs and run them one at a time"""
+    # crewai is only loaded here, so the app process starts without it; the
+    # worker pays for the import once, before it claims its first job
+    from crew import ContentCalendarCrew
+    from model_config import semantic_index, stage_store
+
+    queue = JobQueue(path)
+    # jobs run one at a time, so a crew can be reused by every job with the
+    # same options; the month is part of the key as the horizon starts at it
+    crews = {}
+    current = {}
+
+    def beat():
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            job_id = current.get('job')
+            if job_id is not None:
+                queue.heartbeat(job_id)
+
+    threading.Thread(target=beat, daemon=True).start()
+    while True:
+        # jobs of workers that died, here or under another server, are picked up again
+        queue.requeue_orphaned()
+        job = queue.claim(worker_id())
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        job_id, brand_input, options = job
+        current['job'] = job_id
+        try:
+            key = (time.strftime('%Y-%m'), json.dumps(options, sort_keys=True))
+            if key not in crews:
+                crews[key] = ContentCalendarCrew(parallel=True, shard_content=True, store=stage_store,
+                                                 index=semantic_index, **options)
+            run_job(queue, job_id, brand_input, crews[key])
+        except Exception as e:
+            queue.fail(job_id, str(e))
+        finally:
+            current['job'] = None
+
+
+def start_workers(path=".jobs.sqlite", count=2):
+    """Start worker processes; jobs orphaned by a previous server are requeued.
+
+    Workers are spawned rather than forked, as the server process already
+    runs threads whose locks a fork would copy in whatever state they are.
+    """
+    JobQueue(path).requeue_orphaned()
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for _ in range(count):
+        process = context.Process(target=worker, args=(path,), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any
+
+from llm_wrapper import LLMWrapper
+from scheduler import current_stage, emit
+
+
+class ResponseCache:
+    """Persistent key -> text store in SQLite with size-based LRU eviction"""
+
+    def __init__(self, path=".llm_cache.sqlite", max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stage_stats = {}
+        self._lock = threading.Lock()
+
+        with self._db() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    stage TEXT,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+    def _db(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def _count(self, stage, hit):
+        stats = self.stage_stats.setdefault(stage or "unknown", {"hits": 0, "misses": 0})
+        if hit:
+            self.hits += 1
+            stats["hits"] += 1
+        else:
+            self.misses += 1
+            stats["misses"] += 1
+
+    def get(self, key, stage=None):
+        with self._lock, self._db() as db:
+            row = db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._count(stage, row is not None)
+        return row[0] if row else None
+
+    def put(self, key, value, stage=None):
+        size = len(value.encode('utf-8'))
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, stage, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, value, size, time.time())
+            )
+            self._evict(db)
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        stale = []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        db.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock, self._db() as db:
+            db.execute("DELETE FROM entries")
+
+    def stats(self, since=None):
+        """Hit and miss counts, overall and per stage, with the cache's size.
+
+        The counts add up over the life of the process; pass an earlier
+        stats() snapshot as since to count only the lookups made after it.
+        """
+        with self._lock, self._db() as db:
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            stages = {stage: dict(counts) for stage, counts in self.stage_stats.items()}
+            hits, misses = self.hits, self.misses
+        if since is not None:
+            hits -= since["hits"]
+            misses -= since["misses"]
+            for stage, counts in stages.items():
+                earlier = since["stages"].get(stage, {})
+                counts["hits"] -= earlier.get("hits", 0)
+                counts["misses"] -= earlier.get("misses", 0)
+            stages = {stage: counts for stage, counts in stages.items() if counts["hits"] or counts["misses"]}
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "stages": stages,
+        }
+
+
+class CachedLLM(LLMWrapper):
+    """Wraps a crewai LLM and answers repeated prompts from a ResponseCache,
+    keyed by LLMWrapper.call_key"""
+
+    cache: Any = None
+
+    def __init__(self, llm, cache):
+        super().__init__(llm, cache=cache)
+
+    def call(self, messages, *args, **kwargs):
+        stage = current_stage()
+        key = self.call_key(messages)
+        cached = self.cache.get(key, stage=stage)
+        if cached is not None:
+            emit("token", text=cached)
+            return cached
+
+        response = self.call_wrapped(messages, *args, **kwargs)
+        if isinstance(response, str) and response:
+            self.cache.put(key, response, stage=stage)
+        return response
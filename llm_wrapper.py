@@ -0,0 +1,158 @@
+import contextlib
+import contextvars
+import threading
+import time
+import warnings
+from typing import Any
+
+from crewai import BaseLLM
+from crewai.events import LLMStreamChunkEvent, crewai_event_bus
+from crewai.llms.base_llm import call_stop_override, call_stream_override
+from context_compaction import count_tokens
+from output_limits import StopGeneration
+from scheduler import emit, fingerprint, listening, output_limit
+
+# StreamValidator of the streamed call running in this context, if any
+_validator = contextvars.ContextVar('validator', default=None)
+
+
+class LLMWrapper(BaseLLM):
+    """Base for layers around another crewai LLM; delegates calls to it"""
+
+    llm: Any = None
+
+    def __init__(self, llm, **fields):
+        super().__init__(
+            model=llm.model,
+            temperature=llm.temperature,
+            max_tokens=llm.max_tokens,
+            base_url=llm.base_url,
+            stop=list(llm.stop),
+            llm=llm,
+            **fields
+        )
+
+    def call_wrapped(self, messages, *args, **kwargs):
+        # agents set their stop words as a per-call override on the llm they
+        # hold, which is this wrapper; pass it down to the wrapped llm
+        with call_stop_override(self.llm, self.stop_sequences):
+            return self.llm.call(messages, *args, **kwargs)
+
+    def call(self, messages, *args, **kwargs):
+        return self.call_wrapped(messages, *args, **kwargs)
+
+    def call_key(self, messages):
+        """Fingerprint of a call: the model, base url, temperature, token
+        limit, stop words, the rendered messages, which already hold the
+        task description and the upstream context, and the OutputLimit the
+        answer may be cut at"""
+        limit = output_limit()
+        return fingerprint(
+            self.llm.model,
+            self.base_url,
+            self.llm.temperature,
+            self.llm.max_tokens,
+            sorted(self.stop_sequences),
+            messages,
+            limit and limit.key(),
+        )
+
+    def supports_function_calling(self):
+        return getattr(self.llm, 'supports_function_calling', lambda: False)()
+
+    def supports_stop_words(self):
+        return self.llm.supports_stop_words()
+
+    def supports_multimodal(self):
+        return self.llm.supports_multimodal()
+
+    def get_context_window_size(self):
+        return self.llm.get_context_window_size()
+
+
+class StreamingLLM(LLMWrapper):
+    """Streams the wrapped llm's output while a graph listener is attached
+    or the running stage has an output limit.
+
+    crewai emits stream chunk events synchronously in the calling context, so
+    forward_chunk can hand them to the listener of the stage running there,
+    and, while limited calls run, checking_chunks can end a call once the
+    stage's StreamValidator has all it needs. On a crewai release without
+    the hook, the whole answer is generated and then cut by the validator.
+    Otherwise it is a plain pass-through.
+    """
+
+    def call(self, messages, *args, **kwargs):
+        limit = output_limit()
+        if not listening() and limit is None:
+            return self.call_wrapped(messages, *args, **kwargs)
+
+        stop = list(dict.fromkeys(self.stop_sequences + (limit.stop_sequences() if limit else [])))
+        validator = limit.validator() if limit else None
+        validator_token = _validator.set(validator)
+        started = time.perf_counter()
+        try:
+            with checking_chunks(validator is not None) as checked, call_stream_override(self.llm, True), \
+                    call_stop_override(self.llm, stop):
+                response = self.llm.call(messages, *args, **kwargs)
+            if validator is not None and not checked and isinstance(response, str) and validator.feed(response):
+                return validator.text
+            return response
+        except StopGeneration:
+            # the rest of the stream is dropped, which ends the generation server-side
+            agent = kwargs.get('from_agent')
+            emit("llm_stopped", agent=getattr(agent, 'role', None), seconds=time.perf_counter() - started,
+                 completion_tokens=count_tokens(validator.text))
+            return validator.text
+        finally:
+            _validator.reset(validator_token)
+
+
+def check_chunk(emit_chunk):
+    def emit_and_check(self, chunk, *args, **kwargs):
+        emit_chunk(self, chunk, *args, **kwargs)
+        validator = _validator.get()
+        if validator is not None and chunk and kwargs.get('tool_call') is None and validator.feed(chunk):
+            raise StopGeneration()
+    emit_and_check.wrapped = emit_chunk
+    return emit_and_check
+
+
+# providers stream through this private BaseLLM method, in the calling thread
+STOP_HOOK = '_emit_stream_chunk_event'
+_hook_lock = threading.Lock()
+_hook_users = 0
+
+
+@contextlib.contextmanager
+def checking_chunks(needed=True):
+    """Wrap BaseLLM's chunk emitter with check_chunk while any limited call
+    runs, so other calls only see it while one does and ignore it, having
+    no validator. Yields whether chunks are checked; they are not when
+    needed is false or the installed crewai has no such method."""
+    global _hook_users
+    if not needed or not hasattr(BaseLLM, STOP_HOOK):
+        yield False
+        return
+    with _hook_lock:
+        if _hook_users == 0:
+            setattr(BaseLLM, STOP_HOOK, check_chunk(getattr(BaseLLM, STOP_HOOK)))
+        _hook_users += 1
+    try:
+        yield True
+    finally:
+        with _hook_lock:
+            _hook_users -= 1
+            if _hook_users == 0:
+                setattr(BaseLLM, STOP_HOOK, getattr(BaseLLM, STOP_HOOK).wrapped)
+
+
+if not hasattr(BaseLLM, STOP_HOOK):
+    warnings.warn("this crewai release has no stream chunk hook; "
+                  "limited stages are cut after generating their whole answer")
+
+
+@crewai_event_bus.on(LLMStreamChunkEvent)
+def forward_chunk(source, event):
+    if event.chunk:
+        emit("token", text=event.chunk)
@@ -1,7 +1,109 @@
+import json
+import os
 from crewai import LLM
+from backend_pool import BackendPool
+from llm_cache import CachedLLM, ResponseCache
+from llm_wrapper import StreamingLLM
+from semantic_index import SemanticIndex
+from singleflight import CoalescingLLM, SingleFlight
 
-language_model = LLM(
-    model="ollama/llama3.2:3b",
-    base_url="http://localhost:11434",
-    temperature=0.9,
-)
\ No newline at end of file
+MODEL = "ollama/llama3.2:3b"
+
+# LLM_BACKENDS spreads calls over several servers, e.g.
+# "http://gpu1:11434,http://gpu2:11434" or "ollama/llama3.1:8b@http://gpu3:11434"
+backends = [url for url in os.getenv("LLM_BACKENDS", "").split(",") if url.strip()]
+
+if backends:
+    backend_pool = BackendPool.from_urls(
+        backends,
+        model=MODEL,
+        temperature=0.9,
+        max_concurrency=int(os.getenv("LLM_BACKEND_CONCURRENCY", "2")),
+    )
+    backend_pool.start_health_checks(float(os.getenv("LLM_HEALTH_INTERVAL", "15")))
+else:
+    backend_pool = None
+
+# identical prompts (same brand input, same upstream outputs) are answered
+# from disk instead of being regenerated; set LLM_CACHE=off to disable
+response_cache = ResponseCache(
+    path=os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite"),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+)
+
+ROLES = ['brand_analyzer', 'trend_researcher', 'content_strategist', 'copywriter', 'calendar_packager']
+ROLE_SETTINGS = {'model': str, 'temperature': float, 'max_tokens': int}
+DEFAULT_SETTINGS = {'model': MODEL, 'temperature': 0.9, 'max_tokens': None}
+
+
+def role_settings(path=None):
+    """Model, temperature and max_tokens for every agent role.
+
+    Settings come from the defaults, then the JSON file at LLM_ROLES_FILE
+    (models.json if present), whose "default" entry applies to every role,
+    then variables like LLM_COPYWRITER_MODEL or LLM_CALENDAR_PACKAGER_MAX_TOKENS.
+    """
+    path = path or os.getenv("LLM_ROLES_FILE", "models.json")
+    config = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+
+    for name, entry in config.items():
+        if name != 'default' and name not in ROLES:
+            raise ValueError(f"unknown role '{name}' in {path}, expected one of: {', '.join(ROLES)}")
+        unknown = set(entry) - set(ROLE_SETTINGS)
+        if unknown:
+            raise ValueError(f"unknown settings for '{name}' in {path}: {', '.join(sorted(unknown))}")
+
+    settings = {}
+    for role in ROLES:
+        settings[role] = {**DEFAULT_SETTINGS, **config.get('default', {}), **config.get(role, {})}
+        for name, cast in ROLE_SETTINGS.items():
+            value = os.getenv(f"LLM_{role.upper()}_{name.upper()}")
+            if value:
+                settings[role][name] = cast(value)
+    return settings
+
+
+# identical prompts in flight at once, e.g. two users generating the same
+# calendar, are sent to the model once
+llm_flights = SingleFlight()
+
+
+def build_model(model, temperature, max_tokens):
+    if backend_pool is not None:
+        # backends pinned to their own model keep it unless a role asks for another
+        llm = backend_pool.variant(None if model == MODEL else model, temperature, max_tokens)
+    else:
+        llm = LLM(model=model, base_url="http://localhost:11434", temperature=temperature, max_tokens=max_tokens)
+
+    llm = CoalescingLLM(StreamingLLM(llm), llm_flights)
+    if os.getenv("LLM_CACHE", "on").lower() == "off":
+        return llm
+    return CachedLLM(llm, response_cache)
+
+
+# roles with the same settings share one llm
+role_models = {}
+_models = {}
+for role, settings in role_settings().items():
+    key = (settings['model'], settings['temperature'], settings['max_tokens'])
+    if key not in _models:
+        _models[key] = build_model(*key)
+    role_models[role] = _models[key]
+
+# per-stage outputs of the task graph, keyed by the stage's inputs, so a
+# rerun after a form edit only recomputes the stages the edit invalidated
+stage_store = ResponseCache(
+    path=os.getenv("STAGE_STORE_PATH", ".stage_store.sqlite"),
+    max_bytes=int(os.getenv("STAGE_STORE_MAX_MB", "64")) * 1024 * 1024,
+)
+
+# brand profiles and trend reports by the input they were written for, so
+# graph runs for a similar brand reuse or build on them; SEMANTIC_REUSE=off
+# disables it
+if os.getenv("SEMANTIC_REUSE", "on").lower() == "off":
+    semantic_index = None
+else:
+    semantic_index = SemanticIndex(path=os.getenv("SEMANTIC_INDEX_PATH", ".semantic_index.sqlite"))
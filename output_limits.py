@@ -0,0 +1,153 @@
+import os
+import re
+
+from context_compaction import count_tokens, stage_kind
+from file_generator import MAX_POSTS, POST_START
+
+# estimated completion tokens a stage may generate before it is cut off;
+# copy is budgeted per post it has to write. The packager's JSON has no
+# budget, as a cut object would not parse: it stops once the object closes
+OUTPUT_BUDGETS = {
+    'brand': 1200,
+    'trends': 1200,
+    'strategy': 1500,
+}
+TOKENS_PER_POST = 200
+JSON_STAGES = ('calendar',)
+
+# a JSON answer starts after the answer marker, or right away when there is none
+JSON_START = re.compile(r'(?:Final Answer:|\A)\s*(?:```(?:json)?\s*)?\{')
+
+
+def stage_output_budgets():
+    """OUTPUT_BUDGETS with OUTPUT_BUDGET_<STAGE> environment overrides (0 for no budget)"""
+    budgets = dict(OUTPUT_BUDGETS, content=TOKENS_PER_POST)
+    for kind in budgets:
+        value = os.getenv(f"OUTPUT_BUDGET_{kind.upper()}")
+        if value:
+            budgets[kind] = int(value) or None
+    return budgets
+
+
+class StopGeneration(BaseException):
+    """Raised from inside a streaming llm call to abandon the rest of the stream.
+
+    A BaseException so the llm client's error handling, which would report
+    or retry a failed call, lets it through to StreamingLLM.
+    """
+
+
+class OutputLimit:
+    """Output budget of one stage: estimated max tokens and, for copy, the
+    number of posts after which nothing more is needed. A json limit has
+    neither and ends the answer once its top-level JSON object closes"""
+
+    def __init__(self, max_tokens=None, posts=None, json=False):
+        self.max_tokens = max_tokens
+        self.posts = posts
+        self.json = json
+
+    def key(self):
+        """What the limit adds to the keys an answer is stored under"""
+        return [self.max_tokens, self.posts, self.json]
+
+    def stop_sequences(self):
+        # the server stops as soon as the model starts the first post too many
+        if not self.posts:
+            return []
+        return [f"\npost {self.posts + 1}", f"\nPost {self.posts + 1}", f"\n**Post {self.posts + 1}"]
+
+    def validator(self):
+        return StreamValidator(self)
+
+
+class StreamValidator:
+    """Follows a streamed answer and says when it has all the stage needs.
+
+    That is once a post past the required number starts, once the
+    estimated tokens reach the budget, or for a json limit once the answer's
+    JSON object closes. text is then the answer cut back to its last
+    complete post, line or the closing brace.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.text = ''
+        self.done = False
+        self._line_start = 0
+        self._posts = 0
+        self._json_pos = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk):
+        self.text += chunk
+        if self.limit.json:
+            self.check_json()
+            return self.done
+        while not self.done:
+            end = self.text.find('\n', self._line_start)
+            if end == -1:
+                break
+            self.check_line(self._line_start, end)
+            self._line_start = end + 1
+        if not self.done and self.limit.max_tokens and count_tokens(self.text) >= self.limit.max_tokens:
+            self.text = self.text[:self.text.rfind('\n') + 1 or len(self.text)].rstrip()
+            self.done = True
+        return self.done
+
+    def check_json(self):
+        if self._json_pos is None:
+            start = JSON_START.search(self.text)
+            if start is None:
+                return
+            self._json_pos = start.end() - 1
+        for pos in range(self._json_pos, len(self.text)):
+            char = self.text[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.text = self.text[:pos + 1]
+                    self.done = True
+                    return
+        self._json_pos = len(self.text)
+
+    def check_line(self, start, end):
+        # the first post usually shares its line with the answer marker
+        line = self.text[start:end].split('Final Answer:', 1)[-1]
+        if self.limit.posts and POST_START.match(line):
+            self._posts += 1
+            if self._posts > self.limit.posts:
+                self.text = self.text[:start].rstrip()
+                self.done = True
+
+
+def stage_limits(steps, posts_per_content_stage, budgets=None):
+    """OutputLimit per llm stage of a task graph; content stages are
+    budgeted for the posts they have to write, JSON stages stop at the end
+    of their object"""
+    budgets = budgets or stage_output_budgets()
+    limits = {}
+    for name in steps:
+        kind = stage_kind(name)
+        if kind == 'content':
+            posts = posts_per_content_stage or MAX_POSTS
+            per_post = budgets.get('content')
+            limits[name] = OutputLimit(per_post and per_post * posts + 300, posts)
+        elif kind in JSON_STAGES:
+            limits[name] = OutputLimit(json=True)
+        elif kind in budgets:
+            limits[name] = OutputLimit(budgets[kind])
+    return limits
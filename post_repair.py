@@ -0,0 +1,141 @@
+import contextvars
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from content_tasks import brand_details_section, month_section
+from context_compaction import digest
+from file_generator import HASHTAG, PLATFORMS, WORD
+from output_limits import TOKENS_PER_POST, OutputLimit
+from prompt_templates import task_templates
+from scheduler import emit, limiting_output
+from shards import POST_HEADER, split_posts
+
+# words of a post, hashtags and its header aside, below which it counts
+# as malformed: empty, or cut off before its copy
+MIN_WORDS = 8
+
+# estimated tokens of the strategy a repair call is given
+STRATEGY_TOKENS = 300
+
+
+def post_number(block):
+    return int(POST_HEADER.match(block).group(1))
+
+
+def malformed(block):
+    """Whether a post block is too short to hold any copy"""
+    body = HASHTAG.sub('', POST_HEADER.sub('', block, count=1))
+    return len(WORD.findall(body)) < MIN_WORDS
+
+
+def post_platform(block):
+    lowered = block.lower()
+    return next((platform for platform in PLATFORMS if platform in lowered), None)
+
+
+def find_gaps(text, platforms, count):
+    """(index, number, platform, reason) of every post a draft of count posts lacks.
+
+    A malformed post is named by its index among the draft's 'post N'
+    blocks; a missing one, with an index of None, by the first numbers no
+    block has. Numbers may repeat, as when every platform is numbered from
+    1, so it is the number of blocks that says how many are missing.
+    Missing posts are given the platforms in turn by number; copy written
+    for one platform, as a shard is, gets a single platform. A draft
+    without any 'post N' header is only repaired when it is empty, as its
+    posts cannot be told apart.
+    """
+    blocks = split_posts(text)
+    if not blocks and len(WORD.findall(text)) >= MIN_WORDS:
+        return []
+
+    def platform_of(number, block=None):
+        platform = post_platform(block) if block and len(platforms) > 1 else None
+        return platform or platforms[(number - 1) % len(platforms)]
+
+    gaps = [(index, post_number(block), platform_of(post_number(block), block), 'malformed')
+            for index, block in enumerate(blocks) if malformed(block)]
+    numbers = {post_number(block) for block in blocks}
+    free = (number for number in itertools.count(1) if number not in numbers)
+    gaps += [(None, number, platform_of(number), 'missing')
+             for number in itertools.islice(free, max(0, count - len(blocks)))]
+    return gaps
+
+
+def splice_posts(text, replaced, added):
+    """text with its {index: block} posts replaced and the {number: block}
+    posts added, each before the first of its posts numbered higher"""
+    blocks = split_posts(text)
+    blocks = [replaced.get(index, block) for index, block in enumerate(blocks)]
+    for number in sorted(added):
+        at = next((index for index, block in enumerate(blocks) if post_number(block) > number), len(blocks))
+        blocks.insert(at, added[number])
+    return '\n\n'.join(blocks)
+
+
+def as_post(answer, number, platform):
+    """The first post of an answer, headed 'post <number>' and naming its platform"""
+    answer = answer.split('Final Answer:', 1)[-1].strip()
+    blocks = split_posts(answer)
+    block = blocks[0] if blocks else f"post {number}:\n{answer}"
+    header = POST_HEADER.match(block)
+    block = f"{block[:header.start(1)]}{number}{block[header.end(1):]}"
+    if platform not in block.lower():
+        first_line, _, rest = block.partition('\n')
+        block = f"{first_line}\nplatform: {platform}\n{rest}"
+    return block.strip()
+
+
+def repair_prompt(number, platform, strategy, brand_details=None, month=None, template=None):
+    template = template or task_templates['write_missing_post']
+    description = template.render(
+        f"platform: {platform}\npost number: {number}",
+        month_section(month),
+        brand_details_section(brand_details),
+        strategy and f"content strategy:\n{digest(strategy, STRATEGY_TOKENS)}"
+    )
+    return [{"role": "user", "content": f"{description}\n\n{template.expected(platform=platform)}"}]
+
+
+def write_post(llm, number, platform, strategy, brand_details=None, month=None):
+    # a single post is all a repair call needs, so it stops at the next one
+    with limiting_output(OutputLimit(TOKENS_PER_POST * 2, posts=1)):
+        answer = llm.call(repair_prompt(number, platform, strategy, brand_details, month))
+    block = as_post(answer or '', number, platform)
+    return None if malformed(block) else block
+
+
+def repair_posts(llm, drafts, strategy, brand_details=None, month=None, max_workers=8):
+    """Write again only the posts missing or malformed in copywriter drafts.
+
+    drafts is a list of (text, platforms, count); every gap is one small
+    llm call, all of them concurrent. Returns the texts with the written
+    posts spliced in; a post that still comes back malformed is left as it
+    was. Reports a posts_repaired event for the running stage.
+    """
+    gaps = [(i, *gap) for i, (text, platforms, count) in enumerate(drafts)
+            for gap in find_gaps(text, platforms, count)]
+    replaced, added = [{} for _ in drafts], [{} for _ in drafts]
+    if gaps:
+        # every call runs in a copy of this context, so it is attributed to
+        # the running stage and streams to its listener
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(gaps))) as pool:
+            futures = {
+                pool.submit(contextvars.copy_context().run, write_post, llm, number, platform, strategy,
+                            brand_details, month): (i, index, number)
+                for i, index, number, platform, _ in gaps
+            }
+            for future, (i, index, number) in futures.items():
+                block = future.result()
+                if block is None:
+                    continue
+                if index is None:
+                    added[i][number] = block
+                else:
+                    replaced[i][index] = block
+
+    emit("posts_repaired", missing=sum(reason == 'missing' for *_, reason in gaps),
+         malformed=sum(reason == 'malformed' for *_, reason in gaps),
+         repaired=sum(map(len, replaced)) + sum(map(len, added)))
+    return [splice_posts(text, replaced[i], added[i]) if replaced[i] or added[i] else text
+            for i, (text, _, _) in enumerate(drafts)]
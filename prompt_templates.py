@@ -0,0 +1,258 @@
+import json
+import os
+import textwrap
+
+# static instruction text of every task. Whatever differs between runs
+# (platform, month, brand details, seeds) is appended after it by
+# PromptTemplate.render, so prompts for different brands share the longest
+# possible prefix and the inference server can reuse its cached prefill
+TASKS = {
+    'analyze_brand': {
+        'description': """
+            analyze the brand and create comprehensive brand profile.
+
+            extract and define:
+            1. brand voice and tone
+            2. target audience demographics
+            3. content pillars and themes
+            4. brand values and messaging
+            5. competitor analysis
+
+            format output as detailed brand profile with clear guidelines,
+            for the brand information below.
+            """,
+        'expected_output': "comprehensive brand profile with voice guidelines and audience insights",
+    },
+    'research_trends': {
+        'description': """
+            research current social media trends and opportunities.
+
+            identify:
+            1. trending topics relevant to brand niche
+            2. popular hashtags and keywords
+            3. viral content formats
+            4. seasonal opportunities and events
+            5. content gaps in the market
+
+            provide specific trend insights with examples.
+            """,
+        'expected_output': "trend research report with actionable content opportunities",
+    },
+    'create_strategy': {
+        'description': """
+            develop strategic content calendar framework.
+
+            create:
+            1. content themes for each week
+            2. posting frequency per platform
+            3. content mix ratios
+            4. optimal posting times
+            5. content series and campaigns
+
+            organize into monthly calendar structure with clear schedule.
+            """,
+        'expected_output': "strategic content calendar framework with themes and schedule",
+    },
+    'create_multi_month_strategy': {
+        'description': """
+            develop strategic content calendar framework.
+
+            create:
+            1. content themes for each week
+            2. posting frequency per platform
+            3. content mix ratios
+            4. optimal posting times
+            5. content series and campaigns
+
+            organize into monthly calendar structure with clear schedule.
+            give each month listed below its own section headed by its name, with that
+            month's themes, campaigns and seasonal moments, and keep series running across months.
+            """,
+        'expected_output': "{count}-month content strategy with a section per month",
+    },
+    'write_content': {
+        'description': """
+            write 30+ social media posts for the content calendar.
+
+            create posts for each platform:
+            - linkedin: professional insights
+            - twitter: quick tips and threads
+            - instagram: visual captions
+            - facebook: community engagement
+            - tiktok: trending formats
+
+            each post must include:
+            - platform-optimized copy
+            - suggested hashtags
+            - call to action
+            - best posting time
+            - content type
+
+            write minimum 30 complete posts covering full month.
+            number the posts "post 1", "post 2" and so on through the last post, one
+            sequence across all platforms rather than one per platform.
+            """,
+        'expected_output': "30+ platform-optimized social media posts with hashtags and timing",
+    },
+    'write_platform_content': {
+        'description': """
+            write social media posts for one platform for the content calendar.
+
+            number the posts "post 1", "post 2" and so on, and spread them across the full month.
+
+            each post must include:
+            - platform-optimized copy
+            - suggested hashtags
+            - call to action
+            - best posting time
+            - content type
+
+            write exactly the number of complete posts given below, all for the platform given below.
+            """,
+        'expected_output': "{count} {platform}-optimized social media posts with hashtags and timing",
+    },
+    'write_missing_post': {
+        'description': """
+            write one social media post for the content calendar, to replace a post that
+            is missing from it.
+
+            start it with "post" and its number, and include:
+            - platform-optimized copy
+            - suggested hashtags
+            - call to action
+            - best posting time
+            - content type
+
+            write only this post, for the platform and number given below.
+            """,
+        'expected_output': "one complete {platform}-optimized social media post with hashtags and timing",
+    },
+    'package_calendar': {
+        'description': """
+            create a complete 30-day social media content calendar.
+
+            compile all the content into a structured format with:
+
+            BRAND INFORMATION:
+            - brand name
+            - month and year
+            - total statistics (30+ posts, number of platforms, posts per week, content themes count)
+
+            CONTENT PILLARS (4-6 pillars):
+            for each pillar provide:
+            - pillar name
+            - description
+
+            30+ SOCIAL MEDIA POSTS:
+            for each post provide:
+            - post number (1-30+)
+            - platform (linkedin, twitter, instagram, facebook, or tiktok)
+            - post title (catchy and engaging)
+            - full post content (minimum 50 words, engaging copy)
+            - 5-10 relevant hashtags
+            - posting day (monday-sunday)
+            - posting time (specific time like 9:00 AM)
+            - content type (educational, promotional, entertaining, etc)
+
+            HASHTAG BANK:
+            - list of 20-30 relevant hashtags for the brand
+
+            POSTING SCHEDULE:
+            for each platform provide:
+            - platform name
+            - posting frequency (daily, 3x week, etc)
+            - best posting times
+            - content type focus
+
+            KPI TARGETS (6-8 metrics):
+            - metric name
+            - target value
+
+            organize everything clearly and make sure all 30+ posts are complete with engaging content that matches the brand voice and goals.
+
+            return the calendar as a single JSON object in the requested format, with no text before or after it.
+            """,
+        'expected_output': "complete organized content calendar with brand info, 30+ detailed posts with full content and hashtags, content pillars, hashtag bank, posting schedule, and KPI targets",
+    },
+}
+
+AGENTS = {
+    'brand_analyzer': {
+        'role': 'brand strategy analyst',
+        'goal': 'analyze brand voice, target audience, and content goals',
+        'backstory': 'expert in brand positioning and audience research with deep understanding of social media dynamics',
+    },
+    'trend_researcher': {
+        'role': 'social media trend researcher',
+        'goal': 'identify trending topics, hashtags, and content opportunities',
+        'backstory': 'social media analyst specializing in viral content patterns and platform algorithms',
+    },
+    'content_strategist': {
+        'role': 'content calendar strategist',
+        'goal': 'create strategic content calendar with posting schedule and themes',
+        'backstory': 'content strategy expert with experience planning social media campaigns for brands',
+    },
+    'copywriter': {
+        'role': 'social media copywriter',
+        'goal': 'write engaging posts optimized for each platform',
+        'backstory': 'creative copywriter specialized in viral social media content and platform-specific formats',
+    },
+    'calendar_packager': {
+        'role': 'content calendar compiler',
+        'goal': 'compile content calendar into professional html format with all posts and scheduling details',
+        'backstory': 'content operations specialist expert in organizing and presenting content calendars',
+    },
+}
+
+
+class PromptTemplate:
+    """A task's static instructions, dedented once; per-run sections are appended after them"""
+
+    def __init__(self, description, expected_output):
+        self.description = textwrap.dedent(description).strip()
+        self.expected_output = expected_output
+
+    def render(self, *sections):
+        """The description followed by the non-empty sections, in the order given"""
+        return '\n\n'.join([self.description, *(section for section in sections if section)])
+
+    def expected(self, **values):
+        return self.expected_output.format(**values)
+
+
+def load_overrides(path):
+    """Template overrides from a YAML or JSON file with "tasks" and "agents" entries"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(f"reading {path} needs PyYAML: pip install pyyaml") from None
+            overrides = yaml.safe_load(f) or {}
+        else:
+            overrides = json.load(f)
+
+    for kind, defaults in (('tasks', TASKS), ('agents', AGENTS)):
+        unknown = set(overrides.get(kind, {})) - set(defaults)
+        if unknown:
+            raise ValueError(f"unknown {kind} in {path}: {', '.join(sorted(unknown))}")
+    return overrides
+
+
+def compile_templates(path=None):
+    """(task templates, agent definitions) from the defaults and the file at
+    PROMPT_TEMPLATES_FILE (prompts.yaml if present), entry by entry"""
+    path = path or os.getenv("PROMPT_TEMPLATES_FILE", "prompts.yaml")
+    overrides = load_overrides(path) if os.path.exists(path) else {}
+    tasks = {
+        name: PromptTemplate(**{**entry, **overrides.get('tasks', {}).get(name, {})})
+        for name, entry in TASKS.items()
+    }
+    agents = {
+        name: {**entry, **overrides.get('agents', {}).get(name, {})}
+        for name, entry in AGENTS.items()
+    }
+    return tasks, agents
+
+
+task_templates, agent_definitions = compile_templates()
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import contextvars
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from context_compaction import compact
+
+# same divider crewai uses when it joins upstream task outputs into a context
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+# crewai hands agent work to other threads with contextvars.copy_context(),
+# so the running stage is tracked in context variables rather than a
+# thread-local
+_stage = contextvars.ContextVar('stage', default=None)
+_listener = contextvars.ContextVar('listener', default=None)
+_output_limit = contextvars.ContextVar('output_limit', default=None)
+
+
+def fingerprint(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def current_stage():
+    """Name of the graph step being run in this context, if any"""
+    return _stage.get()
+
+
+def output_limit():
+    """OutputLimit of the graph step being run in this context, if any"""
+    return _output_limit.get()
+
+
+def listening():
+    return _listener.get() is not None
+
+
+@contextmanager
+def listening_with(listener):
+    """Send the events of everything run in this block to listener"""
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+@contextmanager
+def limiting_output(limit):
+    """Stop the llm calls made in this block at limit, an OutputLimit"""
+    token = _output_limit.set(limit)
+    try:
+        yield
+    finally:
+        _output_limit.reset(token)
+
+
+def emit(event_type, **fields):
+    """Send a progress event for the current stage to the run's listener"""
+    listener = _listener.get()
+    if listener is not None:
+        listener({"type": event_type, "stage": current_stage(), **fields})
+
+
+class StepOutput:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __str__(self):
+        return self.raw
+
+
+class LocalStep:
+    """A graph step computed in python from the raw outputs of its context"""
+
+    def __init__(self, fn, context):
+        self.fn = fn
+        self.context = context
+
+
+class GraphResult:
+    """Outputs of a graph run, shaped like the CrewOutput returned by kickoff"""
+
+    def __init__(self, outputs, final, reused=(), context_tokens=None, report=None, recalled=None):
+        self.outputs = outputs
+        self.tasks_output = list(outputs.values())
+        self.raw = outputs[final].raw
+        self.pydantic = getattr(outputs[final], 'pydantic', None)
+        self.reused = [name for name in outputs if name in reused]
+        # estimated context tokens per compacted stage, {"before": n, "after": n}
+        self.context_tokens = context_tokens or {}
+        # run report from instrumentation.RunRecorder, set by the crew
+        self.report = report
+        # similarity of the past outputs reused for similar inputs, see semantic_index
+        self.recalled = recalled or {}
+
+    def __str__(self):
+        return self.raw
+
+
+def dependencies(steps, depends_on=None):
+    """Map each step name to the names of the steps listed in its context.
+
+    depends_on overrides the context of individual steps by name, for tasks
+    whose upstream is a LocalStep (crewai only accepts tasks in a context).
+    """
+    names = {id(step): name for name, step in steps.items()}
+    deps = {}
+    for name, step in steps.items():
+        if depends_on and name in depends_on:
+            deps[name] = list(depends_on[name])
+            continue
+        context = step.context if isinstance(step.context, list) else []
+        deps[name] = []
+        for upstream in context:
+            if id(upstream) not in names:
+                raise ValueError(f"step '{name}' depends on a task that is not part of the graph")
+            deps[name].append(names[id(upstream)])
+    return deps
+
+
+def run_step(step, context):
+    """Run a step on the texts of its upstream outputs"""
+    if isinstance(step, LocalStep):
+        return StepOutput(step.fn(context))
+    return step.execute_sync(context=CONTEXT_DIVIDER.join(context))
+
+
+def step_key(name, step, context, limit=None):
+    """Fingerprint of everything a task's output depends on: its rendered
+    description, the model answering it with its sampling settings, the
+    upstream context it gets and the OutputLimit it may be cut at"""
+    llm = getattr(step.agent, 'llm', None)
+    return fingerprint(
+        name,
+        step.description,
+        step.expected_output,
+        getattr(llm, 'model', None),
+        getattr(llm, 'temperature', None),
+        getattr(llm, 'max_tokens', None),
+        sorted(getattr(llm, 'stop', None) or []),
+        context,
+        limit and limit.key(),
+    )
+
+
+def run_stored_step(name, step, context, store, reused, limit=None):
+    if store is None or isinstance(step, LocalStep):
+        return run_step(step, context)
+
+    key = step_key(name, step, context, limit)
+    raw = store.get(key, stage=name)
+    if raw is not None:
+        reused.add(name)
+        return StepOutput(raw)
+
+    output = run_step(step, context)
+    store.put(key, output.raw, stage=name)
+    return output
+
+
+def run_named_step(name, step, context, store=None, reused=None, listener=None, budgets=None,
+                   context_tokens=None, submitted=None, recalled=None, limit=None):
+    # llm wrappers attribute their calls and events to the stage, and apply
+    # its output limit, through the context variables set here
+    stage_token = _stage.set(name)
+    listener_token = _listener.set(listener)
+    limit_token = _output_limit.set(limit)
+    started = time.perf_counter()
+    try:
+        emit("stage_started", queued=started - submitted if submitted else 0.0)
+        if recalled and name in recalled:
+            reused.add(name)
+            emit("stage_finished", seconds=time.perf_counter() - started, reused=True)
+            return StepOutput(recalled[name])
+        texts = [output.raw for output in context.values()]
+        # local steps merge upstream outputs, so they always get them whole
+        if budgets and context and not isinstance(step, LocalStep):
+            texts, before, after = compact(name, [(n, output.raw) for n, output in context.items()], budgets)
+            if context_tokens is not None:
+                context_tokens[name] = {"before": before, "after": after}
+            emit("context_compacted", before=before, after=after)
+        output = run_stored_step(name, step, texts, store, reused, limit)
+        emit("stage_finished", seconds=time.perf_counter() - started, reused=name in reused)
+        return output
+    finally:
+        _stage.reset(stage_token)
+        _listener.reset(listener_token)
+        _output_limit.reset(limit_token)
+
+
+def run_graph(steps, max_workers=4, depends_on=None, store=None, listener=None, budgets=None, recalled=None,
+              limits=None):
+    """Run tasks as soon as everything in their context has finished.
+
+    steps is an ordered mapping of name -> task or LocalStep; the last one
+    is the result. With a store, task outputs are persisted under step_key
+    and reused on later runs whose inputs did not change, so only stages
+    downstream of an edit are recomputed. listener, if given, is called
+    from the worker threads with stage_started (with the seconds the stage
+    queued for a worker), token and stage_finished events. budgets maps
+    kinds of stage to the estimated token budget of the upstream context
+    they get (see context_compaction); stages then run on compacted
+    context and report context_compacted events. recalled maps step names
+    to outputs to use instead of running them, e.g. past outputs for a
+    similar input. limits maps step names to the OutputLimit their llm
+    calls stop at (see output_limits).
+    """
+    limits = limits or {}
+    deps = dependencies(steps, depends_on)
+    pending = dict(deps)
+    outputs = {}
+    running = {}
+    reused = set()
+    context_tokens = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            ready = [name for name, needs in pending.items() if all(n in outputs for n in needs)]
+            for name in ready:
+                del pending[name]
+                context = {n: outputs[n] for n in deps[name]}
+                running[pool.submit(run_named_step, name, steps[name], context, store, reused, listener,
+                                    budgets, context_tokens, time.perf_counter(), recalled,
+                                    limits.get(name))] = name
+
+            if not running:
+                raise ValueError(f"dependency cycle between steps: {', '.join(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                outputs[running.pop(future)] = future.result()
+
+    return GraphResult({name: outputs[name] for name in steps}, list(steps)[-1], reused, context_tokens)
@@ -0,0 +1,202 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import closing
+
+from content_tasks import STAGE_FIELDS, niche_hint
+from context_compaction import digest
+
+# similarity a past output needs to be reused as is, and to seed the new
+# generation; a brand profile is written about one brand, so it only seeds
+# another, while trend research depends on little more than the niche
+STAGE_THRESHOLDS = {
+    'brand': {'reuse': None, 'seed': 0.7},
+    'trends': {'reuse': 0.85, 'seed': 0.6},
+}
+
+# estimated tokens of a past output passed to a seeded stage
+SEED_TOKENS = 600
+
+# seconds a past output stays fresh enough to be reused as is; trends go stale
+REUSE_TTL = 7 * 24 * 3600
+
+BUCKETS = 2 ** 18
+WORD = re.compile(r'[a-z0-9]+')
+FIELD_LABEL = re.compile(r'(?m)^[^:\n]*:\s*')
+INDUSTRY = re.compile(r'(?im)^\s*industry:\s*(.*)$')
+
+
+def embed(text):
+    """Unit-length sparse vector {bucket: weight} of hashed words and character trigrams"""
+    features = Counter()
+    for word in WORD.findall(text.lower()):
+        features[f"w:{word}"] += 1
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            features[f"c:{padded[i:i + 3]}"] += 1
+
+    vector = Counter()
+    for feature, count in features.items():
+        # crc32 rather than hash() so vectors stay comparable across processes
+        vector[zlib.crc32(feature.encode('utf-8')) % BUCKETS] += 1 + math.log(count)
+    norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+    return {bucket: weight / norm for bucket, weight in vector.items()}
+
+
+def similarity(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+def stage_queries(brand_input):
+    """The filled-in input fields each indexed stage depends on, without their labels"""
+    if isinstance(brand_input, dict):
+        return {
+            stage: '\n'.join(', '.join(value) if isinstance(value, (list, tuple)) else str(value)
+                             for value in (brand_input.get(name) for name in STAGE_FIELDS[stage]) if value)
+            for stage in STAGE_THRESHOLDS
+        }
+    return {stage: FIELD_LABEL.sub('', text) for stage, text in
+            (('brand', str(brand_input)), ('trends', niche_hint(brand_input)))}
+
+
+def industry_scope(brand_input):
+    """The brand's industry, lowercased words only; outputs are only ever
+    recalled for a brand in the same industry"""
+    if isinstance(brand_input, dict):
+        industry = brand_input.get('industry') or ''
+    else:
+        match = INDUSTRY.search(str(brand_input))
+        industry = match.group(1) if match else ''
+    return ' '.join(WORD.findall(industry.lower()))
+
+
+def seed_texts(seeds):
+    """{stage: digest of the seeding output} for seeds from SemanticIndex.recall"""
+    return {stage: digest(match.value, SEED_TOKENS) for stage, match in seeds.items()}
+
+
+class Match:
+    def __init__(self, similarity, query, value, created):
+        self.similarity = similarity
+        self.query = query
+        self.value = value
+        self.created = created
+
+
+class SemanticIndex:
+    """Past stage outputs in SQLite, looked up by the similarity of the
+    input they were generated for (see embed) among those of the same
+    scope, the brand's industry. Keeps the newest max_entries outputs per
+    stage, and reuses them as is for reuse_ttl seconds."""
+
+    def __init__(self, path=".semantic_index.sqlite", max_entries=1000, thresholds=None, reuse_ttl=REUSE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.thresholds = thresholds or STAGE_THRESHOLDS
+        self.reuse_ttl = reuse_ttl
+        self._lock = threading.Lock()
+
+        with self._db() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS outputs (
+                    stage TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    scope TEXT NOT NULL DEFAULT '',
+                    source TEXT NOT NULL DEFAULT '',
+                    vector TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (stage, query)
+                )
+            """)
+            columns = [row[1] for row in db.execute("PRAGMA table_info(outputs)")]
+            for column in ('scope', 'source'):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE outputs ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+
+    def _db(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def add(self, stage, query, value, scope='', source=''):
+        """Store value, the output for query; source is the query of the
+        output it was seeded with, if any"""
+        vector = json.dumps(embed(query))
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO outputs (stage, query, scope, source, vector, value, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (stage, query, scope, source, vector, value, time.time())
+            )
+            db.execute("""
+                DELETE FROM outputs WHERE stage = ? AND rowid NOT IN (
+                    SELECT rowid FROM outputs WHERE stage = ? ORDER BY created DESC LIMIT ?
+                )
+            """, (stage, stage, self.max_entries))
+
+    def source(self, stage, query, scope=''):
+        """Query of the output that seeded the one stored for query ('' if
+        none), or None when query has no output of its own"""
+        with self._lock, self._db() as db:
+            row = db.execute("SELECT source FROM outputs WHERE stage = ? AND scope = ? AND query = ?",
+                             (stage, scope, query)).fetchone()
+        return row and row[0]
+
+    def get(self, stage, query, scope=''):
+        """Match of the output stored for query, or None"""
+        with self._lock, self._db() as db:
+            row = db.execute("SELECT value, created FROM outputs WHERE stage = ? AND scope = ? AND query = ?",
+                             (stage, scope, query)).fetchone()
+        return row and Match(None, query, *row)
+
+    def nearest(self, stage, query, scope=''):
+        """Match of the stored output of the same scope whose query is most
+        similar, other than the one stored for query itself, or None"""
+        vector = embed(query)
+        best = None
+        with self._lock, self._db() as db:
+            for past_query, past_vector, value, created in db.execute(
+                    "SELECT query, vector, value, created FROM outputs WHERE stage = ? AND scope = ? AND query != ?",
+                    (stage, scope, query)):
+                score = similarity(vector, {int(k): v for k, v in json.loads(past_vector).items()})
+                if best is None or score > best.similarity:
+                    best = Match(score, past_query, value, created)
+        return best
+
+    def recall(self, queries, scope=''):
+        """Look up every stage's query among the outputs of the same scope.
+
+        Returns ({stage: Match} to reuse as is, {stage: Match} to seed the
+        generation with, see seed_texts) by each stage's thresholds. A query
+        that already has an output of its own is seeded as it was then, so
+        a rerun builds the same prompts and the stage store answers them.
+        """
+        reuse, seeds = {}, {}
+        now = time.time()
+        for stage, query in queries.items():
+            source = self.source(stage, query, scope)
+            if source is not None:
+                match = source and self.get(stage, source, scope)
+                if match:
+                    seeds[stage] = match
+                continue
+            match = self.nearest(stage, query, scope)
+            if match is None:
+                continue
+            thresholds = self.thresholds[stage]
+            if thresholds['reuse'] is not None and match.similarity >= thresholds['reuse'] \
+                    and now - match.created <= self.reuse_ttl:
+                reuse[stage] = match
+            elif match.similarity >= thresholds['seed']:
+                seeds[stage] = match
+        return reuse, seeds
+
+    def clear(self):
+        with self._lock, self._db() as db:
+            db.execute("DELETE FROM outputs")
@@ -0,0 +1,56 @@
+import math
+import re
+
+DEFAULT_PLATFORMS = ['linkedin', 'twitter', 'instagram', 'facebook', 'tiktok']
+
+POST_HEADER = re.compile(r'^[ \t>*#_-]*post\s*#?\s*(\d+)', re.IGNORECASE | re.MULTILINE)
+PLATFORM_LABEL = re.compile(r'^[ \t>*_-]*platform\s*:', re.IGNORECASE | re.MULTILINE)
+
+
+def platforms_from_input(brand_input):
+    """Read the selected platforms from the 'platforms:' line of the brand input"""
+    match = re.search(r'^\s*platforms:\s*(.+)$', str(brand_input), re.IGNORECASE | re.MULTILINE)
+    if match:
+        platforms = [p.strip().lower() for p in match.group(1).split(',')]
+        platforms = [p for p in platforms if p in DEFAULT_PLATFORMS]
+        if platforms:
+            return platforms
+    return list(DEFAULT_PLATFORMS)
+
+
+def posts_per_shard(total_posts, shard_count):
+    return math.ceil(total_posts / max(shard_count, 1))
+
+
+def split_posts(text):
+    """Split copywriter output into one block per 'post N' header"""
+    headers = list(POST_HEADER.finditer(text))
+    return [
+        text[header.start():headers[i + 1].start() if i + 1 < len(headers) else len(text)].strip()
+        for i, header in enumerate(headers)
+    ]
+
+
+def with_platform(block, platform):
+    """block with a 'platform:' line under its header, unless it has one"""
+    if PLATFORM_LABEL.search(block.replace('**', '')):
+        return block
+    first_line, _, rest = block.partition('\n')
+    return f"{first_line}\nplatform: {platform}\n{rest}"
+
+
+def merge_post_shards(shards):
+    """Merge (platform, text) shards into a single sequentially numbered post list"""
+    merged = []
+    for platform, text in shards:
+        blocks = split_posts(text)
+        if not blocks:
+            blocks = [f"post 1:\n{text.strip()}"] if text.strip() else []
+
+        for block in blocks:
+            number = len(merged) + 1
+            header = POST_HEADER.match(block)
+            block = f"{block[:header.start(1)]}{number}{block[header.end(1):]}"
+            merged.append(with_platform(block, platform).strip())
+
+    return '\n\n'.join(merged)
@@ -0,0 +1,76 @@
+import threading
+from typing import Any
+
+from pydantic import PrivateAttr
+
+from llm_wrapper import LLMWrapper
+from scheduler import emit
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+
+    Callers that arrive with the key of a call still in flight wait for it
+    and get its result (or its exception) instead of running their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class CoalescingLLM(LLMWrapper):
+    """Identical prompts sent while one is still being answered share its answer"""
+
+    _flights: Any = PrivateAttr(default=None)
+
+    def __init__(self, llm, flights=None):
+        super().__init__(llm)
+        self._flights = flights or SingleFlight()
+
+    def call(self, messages, *args, **kwargs):
+        leader = []
+
+        def answer():
+            leader.append(True)
+            return self.call_wrapped(messages, *args, **kwargs)
+
+        response = self._flights.do(self.call_key(messages), answer)
+        if not leader:
+            # the leader streamed its tokens to its own stage
+            emit("token", text=response)
+        return response
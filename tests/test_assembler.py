@@ -0,0 +1,16 @@
+from assembler import assemble_post
+
+POST = """post 1:
+platform: instagram
+Time-saving hacks for your morning brew.
+posting time: 9:00 AM
+content type: reel
+Time: for a refill, swing by after lunch.
+#coffee #morning"""
+
+
+def test_labels_need_a_colon_and_the_first_one_wins():
+    post = assemble_post(0, POST)
+    assert post["posting_time"] == "9:00 AM"
+    assert post["content_type"] == "reel"
+    assert post["platform"] == "instagram"
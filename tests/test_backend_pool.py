@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend_pool import FAILOVER_ERRORS, BackendPool
+from fake_llm import FakeLLMServer
+
+MESSAGES = [{"role": "user", "content": "write one post"}]
+
+
+@pytest.fixture
+def servers():
+    servers = [FakeLLMServer(delay=0.3).start(), FakeLLMServer(delay=0.3).start()]
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def make_pool(servers):
+    return BackendPool.from_urls([server.url for server in servers], model="ollama/llama3.2:3b",
+                                 max_concurrency=1, cooldown=60.0)
+
+
+def test_calls_are_spread_over_backends(servers):
+    pool = make_pool(servers)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        answers = list(executor.map(lambda _: pool.call(MESSAGES), range(4)))
+
+    assert all("Final Answer" in answer for answer in answers)
+    assert [server.requests for server in servers] == [2, 2]
+    assert [stats["served"] for stats in pool.stats()] == [2, 2]
+    assert [stats["outstanding"] for stats in pool.stats()] == [0, 0]
+
+
+def test_fails_over_and_recovers_when_a_backend_goes_down(servers):
+    first, second = servers
+    pool = make_pool(servers)
+    first.down = True
+
+    for _ in range(3):
+        assert "Final Answer" in pool.call(MESSAGES)
+
+    # the failing backend is tried once, then left out until it is healthy again
+    assert second.requests == 3
+    down, up = pool.stats()
+    assert (down["healthy"], down["failures"], down["served"]) == (False, 1, 0)
+    assert (up["healthy"], up["served"]) == (True, 3)
+
+    first.down = False
+    pool.check_health()
+    assert pool.stats()[0]["healthy"]
+    pool.call(MESSAGES)
+    assert first.requests == 1
+    assert pool.stats()[0]["served"] == 1
+
+
+def test_raises_when_every_backend_is_down(servers):
+    pool = make_pool(servers)
+    for server in servers:
+        server.down = True
+
+    with pytest.raises(FAILOVER_ERRORS):
+        pool.call(MESSAGES)
+    assert [stats["failures"] for stats in pool.stats()] == [1, 1]
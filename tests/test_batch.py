@@ -0,0 +1,14 @@
+import json
+
+from batch import Checkpoint
+
+
+def test_resume_skips_a_partial_last_record(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text(json.dumps({"brand": "bean_there", "seconds": 12.5}) + '\n{"brand": "ledger', encoding='utf-8')
+
+    checkpoint = Checkpoint(str(path))
+    assert list(checkpoint.done) == ["bean_there"]
+
+    checkpoint.record({"brand": "ledgerlite", "seconds": 9.0})
+    assert list(Checkpoint(str(path)).done) == ["bean_there", "ledgerlite"]
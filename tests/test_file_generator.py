@@ -0,0 +1,45 @@
+from io import BytesIO
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, Spacer
+from reportlab.platypus.flowables import PageBreakIfNotEmpty
+
+from file_generator import StreamingDocTemplate, parse_text_output, parse_text_output_regex
+
+TEXT = "\n\n".join(
+    f"post {number}:\nplatform: instagram\ntitle: idea {number}\n"
+    f"content: {'grow the brand with the community today ' * 12}\nhashtags: #grow #brand"
+    for number in range(1, 31)
+)
+
+
+def test_regex_fallback_parses_the_same_posts():
+    single_pass, regex = parse_text_output(TEXT), parse_text_output_regex(TEXT)
+    assert len(regex["posts"]) == len(single_pass["posts"]) == 30
+    assert all(len(post["content"]) == 300 for post in regex["posts"])
+
+
+def layout(build):
+    styles = getSampleStyleSheet()
+    heading = ParagraphStyle("KeptHeading", parent=styles["Heading2"], keepWithNext=1)
+    flowables = []
+    # every heading fits at the foot of a page, but not together with the spacer it is kept with
+    for number in range(6):
+        flowables += [Spacer(1, 560), Paragraph(f"week {number}", heading), Spacer(1, 150),
+                      Paragraph("plan the week " * 40, styles["Normal"]), PageBreakIfNotEmpty()]
+    pages = []
+    doc = StreamingDocTemplate(BytesIO(), pagesize=letter)
+    doc.afterFlowable = lambda flowable: pages.append((doc.page, getattr(flowable, "text", "")[:12]))
+    build(doc, flowables)
+    return pages
+
+
+def test_streamed_build_lays_out_like_build():
+    def stream(doc, flowables):
+        doc.build_stream(iter(flowables), lambda canv, doc: None, lambda canv, doc: None)
+
+    def whole(doc, flowables):
+        doc.build(flowables)
+
+    assert layout(stream) == layout(whole)
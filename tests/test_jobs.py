@@ -0,0 +1,35 @@
+import socket
+import subprocess
+import sys
+import time
+
+from jobs import QUEUED, RUNNING, JobQueue, worker_id
+
+
+def running_job(queue, worker):
+    job_id = queue.submit({"brand_name": worker or "nobody"})
+    assert queue.claim(worker)[0] == job_id
+    return job_id
+
+
+def test_only_jobs_of_gone_workers_are_requeued(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+
+    live = running_job(queue, worker_id())
+    dead = running_job(queue, f"{socket.gethostname()}:{exited.pid}")
+    remote = running_job(queue, "another-host:1")
+
+    assert queue.requeue_orphaned() == [dead]
+    assert [queue.get(job)["status"] for job in (live, dead, remote)] == [RUNNING, QUEUED, RUNNING]
+
+
+def test_jobs_without_a_heartbeat_are_requeued(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    job_id = running_job(queue, "another-host:1")
+    time.sleep(0.05)
+
+    assert queue.requeue_orphaned(stale_after=60) == []
+    assert queue.requeue_orphaned(stale_after=0.01) == [job_id]
+    assert queue.get(job_id)["status"] == QUEUED
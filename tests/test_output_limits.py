@@ -0,0 +1,76 @@
+import json
+from types import SimpleNamespace
+
+from context_compaction import count_tokens
+from output_limits import OutputLimit, stage_limits
+from scheduler import step_key
+
+ANSWER = {"brand_name": "Bean There", "posts": [{"caption": "Open {late} tonight \\o/", "hashtags": ["#coffee"]}]}
+
+
+def stream(text, limit, size=3):
+    validator = limit.validator()
+    for start in range(0, len(text), size):
+        if validator.feed(text[start:start + size]):
+            return validator.text, True
+    return validator.text, False
+
+
+def test_json_answer_stops_when_the_object_closes():
+    body = json.dumps(ANSWER)
+    text = f"Thought: fill in the {{posts}}\nFinal Answer: ```json\n{body}\n```\nLet me know if you need more."
+
+    answer, done = stream(text, OutputLimit(json=True))
+    assert done
+    assert json.loads(answer.split("```json", 1)[1]) == ANSWER
+
+
+def test_json_answer_is_never_cut_on_tokens():
+    body = json.dumps({**ANSWER, "posts": ANSWER["posts"] * 200})
+    answer, done = stream(body[:-1], OutputLimit(json=True))
+    assert not done
+    assert answer == body[:-1]
+
+
+def test_calendar_stages_get_a_json_limit():
+    limits = stage_limits(["brand", "calendar_2025_03", "content_2025_03"], 10, {"brand": 1200, "content": 200})
+    assert limits["calendar_2025_03"].json and limits["calendar_2025_03"].max_tokens is None
+    assert (limits["content_2025_03"].max_tokens, limits["content_2025_03"].posts) == (2300, 10)
+
+
+def copy(posts):
+    return "Final Answer: " + "\n\n".join(
+        f"post {number}:\nplatform: instagram\nStart the day slow with a pour-over. #coffee"
+        for number in range(1, posts + 1))
+
+
+def test_copy_stops_when_a_post_too_many_starts():
+    answer, done = stream(copy(12), OutputLimit(posts=10))
+    assert done
+    assert answer.count("post ") == 10
+    assert answer.endswith("#coffee")
+
+
+def test_copy_with_the_posts_it_needs_is_not_cut():
+    text = copy(10)
+    assert stream(text, OutputLimit(posts=10)) == (text, False)
+
+
+def test_token_budget_cuts_at_the_last_line():
+    text = "\n".join(f"trend {number}: short form video keeps growing" for number in range(200))
+    answer, done = stream(text, OutputLimit(max_tokens=100))
+    assert done
+    assert text.startswith(answer)
+    assert answer.endswith("growing")
+    assert count_tokens(answer) <= 100
+
+
+def test_limits_are_part_of_the_keys():
+    assert OutputLimit(1200).key() != OutputLimit(2000).key()
+    assert OutputLimit(json=True).key() != OutputLimit().key()
+
+
+def test_stored_stages_are_keyed_by_their_limit():
+    step = SimpleNamespace(agent=None, description="research trends", expected_output="a trend report")
+    keys = {step_key("trends", step, [], limit) for limit in (None, OutputLimit(1200), OutputLimit(2000))}
+    assert len(keys) == 3
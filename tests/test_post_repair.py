@@ -0,0 +1,70 @@
+from post_repair import find_gaps, malformed, splice_posts
+
+COPY = "Start your morning slow with a pour-over and the sound of rain on the window."
+
+
+def post(number, platform="instagram", copy=COPY, hashtags="#coffee #morning"):
+    return f"post {number}:\nplatform: {platform}\n{copy}\n{hashtags}"
+
+
+def draft(*posts):
+    return "\n\n".join(posts)
+
+
+def test_complete_draft_has_no_gaps():
+    text = draft(*(post(number) for number in range(1, 11)))
+    assert find_gaps(text, ["instagram"], 10) == []
+
+
+def test_only_short_posts_are_malformed():
+    assert not malformed(post(1, hashtags="hashtags: coffee, morning"))
+    assert malformed(post(1, copy="Coffee."))
+    assert malformed("post 1:")
+
+
+def test_missing_numbers_are_found():
+    text = draft(post(1), post(2), post(4))
+    assert find_gaps(text, ["instagram", "linkedin"], 5) == [
+        (None, 3, "instagram", "missing"),
+        (None, 5, "instagram", "missing"),
+    ]
+
+
+def test_numbering_per_platform_keeps_every_post():
+    text = draft(*(post(number, platform) for platform in ("instagram", "linkedin", "tiktok")
+                   for number in range(1, 11)))
+    assert find_gaps(text, ["instagram", "linkedin", "tiktok"], 30) == []
+
+    spliced = splice_posts(text, {}, {})
+    assert spliced == text
+
+
+def test_draft_without_post_headers_is_left_alone():
+    text = "\n\n".join(f"### {number}\n{COPY} #coffee" for number in range(1, 31))
+    assert find_gaps(text, ["instagram"], 30) == []
+
+
+def test_empty_draft_is_written_from_scratch():
+    gaps = find_gaps("", ["instagram", "tiktok"], 3)
+    assert [(index, number, platform) for index, number, platform, _ in gaps] == [
+        (None, 1, "instagram"), (None, 2, "tiktok"), (None, 3, "instagram")]
+    assert splice_posts("", {}, {1: post(1), 2: post(2)}) == draft(post(1), post(2))
+
+
+def test_splice_replaces_by_index_and_adds_by_number():
+    text = draft(post(1), post(2, copy="Coffee."), post(4))
+    gaps = find_gaps(text, ["instagram"], 4)
+    assert [(index, number, reason) for index, number, _, reason in gaps] == [
+        (1, 2, "malformed"), (None, 3, "missing")]
+
+    spliced = splice_posts(text, {1: post(2, copy="A fixed " + COPY)}, {3: post(3, "tiktok")})
+    assert spliced == draft(post(1), post(2, copy="A fixed " + COPY), post(3, "tiktok"), post(4))
+
+
+def test_duplicate_numbers_keep_their_blocks():
+    text = draft(post(1, "instagram"), post(1, "linkedin"), post(2, "instagram"))
+    assert find_gaps(text, ["instagram", "linkedin"], 4) == [(None, 3, "instagram", "missing")]
+
+    spliced = splice_posts(text, {}, {3: post(3)})
+    assert spliced.count("post 1:") == 2
+    assert spliced.endswith(post(3))
@@ -0,0 +1,85 @@
+from semantic_index import SemanticIndex, embed, industry_scope, similarity, stage_queries
+
+AUDIENCE = "remote workers and freelancers aged 25-40 who work from cafes and coworking spaces"
+
+COFFEE = {
+    "brand_name": "Bean There",
+    "industry": "Coffee",
+    "brand_voice": "warm and playful",
+    "target_audience": AUDIENCE,
+    "content_goals": "engagement",
+    "platforms": ["instagram", "linkedin", "tiktok"],
+}
+
+FINTECH = {
+    **COFFEE,
+    "brand_name": "LedgerLite",
+    "industry": "Fintech",
+    "brand_voice": "clear and trustworthy",
+}
+
+
+def remember(index, brand_input, outputs):
+    queries = stage_queries(brand_input)
+    for stage, value in outputs.items():
+        index.add(stage, queries[stage], value, industry_scope(brand_input))
+
+
+def test_same_audience_in_another_industry_is_not_recalled(tmp_path):
+    index = SemanticIndex(path=str(tmp_path / "index.sqlite"))
+    remember(index, COFFEE, {"brand": "coffee brand profile", "trends": "coffee trend report"})
+
+    # the queries alone look alike, which is why recall is scoped by industry
+    queries = stage_queries(FINTECH)
+    assert similarity(embed(queries["trends"]), embed(stage_queries(COFFEE)["trends"])) > 0.85
+
+    reuse, seeds = index.recall(queries, industry_scope(FINTECH))
+    assert reuse == {}
+    assert seeds == {}
+
+
+def test_similar_brand_in_the_same_industry_is_recalled(tmp_path):
+    index = SemanticIndex(path=str(tmp_path / "index.sqlite"))
+    remember(index, COFFEE, {"brand": "coffee brand profile", "trends": "coffee trend report"})
+
+    other_coffee = {**COFFEE, "brand_name": "Daily Grind", "industry": "coffee "}
+    reuse, seeds = index.recall(stage_queries(other_coffee), industry_scope(other_coffee))
+    assert reuse["trends"].value == "coffee trend report"
+    assert seeds["brand"].value == "coffee brand profile"
+
+
+def test_industry_scope_of_text_input():
+    assert industry_scope("brand name: Bean There\nindustry: Specialty  Coffee\n") == "specialty coffee"
+    assert industry_scope("brand name: Bean There") == ""
+
+
+def test_rerun_of_the_same_brand_recalls_nothing(tmp_path):
+    index = SemanticIndex(path=str(tmp_path / "index.sqlite"))
+    remember(index, COFFEE, {"brand": "coffee brand profile", "trends": "coffee trend report"})
+
+    assert index.recall(stage_queries(COFFEE), industry_scope(COFFEE)) == ({}, {})
+
+
+def test_stale_trends_only_seed(tmp_path):
+    index = SemanticIndex(path=str(tmp_path / "index.sqlite"), reuse_ttl=0)
+    remember(index, COFFEE, {"trends": "coffee trend report"})
+
+    other_coffee = {**COFFEE, "brand_name": "Daily Grind", "platforms": ["instagram", "linkedin"]}
+    reuse, seeds = index.recall(stage_queries(other_coffee), industry_scope(other_coffee))
+    assert reuse == {}
+    assert seeds["trends"].value == "coffee trend report"
+
+
+def test_rerun_is_seeded_as_before(tmp_path):
+    index = SemanticIndex(path=str(tmp_path / "index.sqlite"))
+    remember(index, COFFEE, {"brand": "coffee brand profile"})
+    other_coffee = {**COFFEE, "brand_name": "Daily Grind"}
+    queries, scope = stage_queries(other_coffee), industry_scope(other_coffee)
+
+    _, seeds = index.recall(queries, scope)
+    index.add("brand", queries["brand"], "daily grind profile", scope, seeds["brand"].query)
+    # a third brand closer to the second than the first does not change its rerun
+    index.add("brand", queries["brand"] + " cafe", "closer profile", scope)
+
+    _, seeds = index.recall(queries, scope)
+    assert seeds["brand"].value == "coffee brand profile"
@@ -0,0 +1,11 @@
+from shards import merge_post_shards
+
+
+def test_shard_platform_is_added_unless_labelled():
+    merged = merge_post_shards([
+        ("tiktok", "post 1:\nA cross-platform tip for your morning brew.\n#coffee"),
+        ("instagram", "**Post 1:**\n**Platform:** Instagram\nLatte art on every platform.\n#latte"),
+    ])
+    first, second = merged.split("\n\n")
+    assert first.splitlines()[:2] == ["post 1:", "platform: tiktok"]
+    assert second.splitlines()[:2] == ["**Post 2:**", "**Platform:** Instagram"]
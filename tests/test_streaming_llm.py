@@ -0,0 +1,41 @@
+import pytest
+from crewai import LLM, BaseLLM
+
+from fake_llm import FakeLLMServer
+from llm_cache import CachedLLM, ResponseCache
+from llm_wrapper import STOP_HOOK, StreamingLLM
+from output_limits import OutputLimit
+from scheduler import limiting_output
+
+MESSAGES = [{"role": "user", "content": "write the posts"}]
+
+
+@pytest.fixture
+def server():
+    server = FakeLLMServer(posts=20).start()
+    yield server
+    server.stop()
+
+
+def make_llm(server):
+    return StreamingLLM(LLM(model="ollama/llama3.2:3b", base_url=server.url))
+
+
+def test_limited_call_stops_after_its_posts(server):
+    hook = getattr(BaseLLM, STOP_HOOK)
+    with limiting_output(OutputLimit(posts=3)):
+        answer = make_llm(server).call(MESSAGES)
+
+    assert "post 3:" in answer and "post 4" not in answer
+    # the chunk hook is only in place while a limited call runs
+    assert getattr(BaseLLM, STOP_HOOK) is hook
+
+
+def test_answers_are_cached_per_limit(server, tmp_path):
+    llm = CachedLLM(make_llm(server), ResponseCache(path=str(tmp_path / "cache.sqlite")))
+    with limiting_output(OutputLimit(posts=3)):
+        short = llm.call(MESSAGES)
+    full = llm.call(MESSAGES)
+
+    assert server.requests == 2
+    assert "post 20:" in full and "post 20:" not in short